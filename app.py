@@ -1,5 +1,6 @@
 import streamlit as st
 import time
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -11,9 +12,15 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 from main_controller import MainController
 from trader import Trader
 
+HISTORY_PAGE_SIZE = 20
+SYMBOLS = ["BTC/USDT", "ETH/USDT", "AVAX/USDT"]
+# Borsadan sadece 1m mumlar çekilir; 1h analiz mumları yerelde türetilir (tek istek, tüm zaman dilimleri)
+BASE_TIMEFRAME = "1m"
+
 @st.cache_resource
 def get_controller():
-    return MainController()
+    # Prometheus metrikleri: http://127.0.0.1:9108/metrics
+    return MainController(metrics_port=9108, base_timeframe=BASE_TIMEFRAME)
 
 st.set_page_config(page_title="AI Pro Trade Bot", layout="wide", page_icon="🤑")
 st.title("🤑 AI Algoritmik Trade Botu (Dual Mode)")
@@ -29,7 +36,12 @@ with st.sidebar:
         api_key = st.text_input("Binance API Key", type="password")
         api_secret = st.text_input("Binance Secret Key", type="password")
     
-    symbol = st.selectbox("Parite", ["BTC/USDT", "ETH/USDT", "AVAX/USDT"])
+    symbol = st.selectbox("Parite", SYMBOLS)
+    # Grafikteki pariteye ek olarak taranıp işlem yapılacak pariteler (çoklu pozisyon)
+    portfolio_symbols = st.multiselect("Portföy Pariteleri", SYMBOLS, default=[])
+    max_positions = st.number_input("Maks. Eşzamanlı Pozisyon", min_value=1, value=3, step=1)
+    history_page = st.number_input("İşlem Geçmişi Sayfası", min_value=1, value=1, step=1)
+    profile_on = st.checkbox("🔬 Döngü Profili (cProfile + tracemalloc)", value=False)
     
     st.markdown("---")
     
@@ -39,21 +51,37 @@ with st.sidebar:
     start_btn = st.button("▶️ Botu Başlat" if not st.session_state.is_running else "⏹️ Botu Durdur")
     if start_btn:
         st.session_state.is_running = not st.session_state.is_running
-        mode_code = 'REAL' if trade_mode == "REAL (Gerçek)" else 'PAPER'
-        try:
-            st.session_state.trader = Trader(mode=mode_code, api_key=api_key, api_secret=api_secret)
-            st.toast(f"Bot {mode_code} modunda başlatıldı!", icon="🚀")
-        except Exception as e:
-            st.error(f"Başlatma Hatası: {e}")
-            st.session_state.is_running = False
+        if not st.session_state.is_running:
+            # Durdur: bekleyen emirler sonuçlanır ve defterde kalan satırlar DB'ye yazılır
+            if st.session_state.get('trader') is not None:
+                st.session_state.trader.shutdown()
+            get_controller().signal_log.flush()
+            st.toast("Bot durduruldu.", icon="⏹️")
+        else:
+            mode_code = 'REAL' if trade_mode == "REAL (Gerçek)" else 'PAPER'
+            if st.session_state.get('trader') is not None:
+                # Eski trader'ın emir thread'i ve defteri yenisi gelmeden kapatılır
+                st.session_state.trader.shutdown()
+            try:
+                st.session_state.trader = Trader(mode=mode_code, api_key=api_key, api_secret=api_secret,
+                                                 max_positions=int(max_positions))
+                st.toast(f"Bot {mode_code} modunda başlatıldı!", icon="🚀")
+            except Exception as e:
+                st.error(f"Başlatma Hatası: {e}")
+                st.session_state.is_running = False
 
 status_place = st.empty()
 metric_place = st.empty()
 chart_place = st.empty()
 log_place = st.container()
+history_place = st.empty()
 
 if st.session_state.is_running:
     controller = get_controller()
+    # Sadece kutucuk değiştiğinde uygulanır; aksi halde her rerun /profile/on|off ile yapılan ayarı ezerdi
+    if st.session_state.get('profile_on') != profile_on:
+        st.session_state.profile_on = profile_on
+        controller.metrics.set_profiling(cprofile=profile_on, memory=profile_on)
     trader = st.session_state.trader
     
     if trader is None:
@@ -65,7 +93,8 @@ if st.session_state.is_running:
             with status_place.container():
                 st.info(f"📡 {symbol} piyasası taranıyor... Son Güncelleme: {datetime.now().strftime('%H:%M:%S')}")
             
-            # Analiz
+            # Analiz (grafikteki parite + portföy pariteleri)
+            scan_symbols = [symbol] + [s for s in portfolio_symbols if s != symbol]
             results = controller.run_analysis(symbol)
             if "error" in results:
                 st.error(results["error"])
@@ -74,22 +103,42 @@ if st.session_state.is_running:
 
             current_price = results['current_price']
             
-            # Sinyal Üretimi
+            timestamp = results['dataframe']['timestamp'].iloc[-1]
+
+            # Sinyal Üretimi (karar, bileşen skorlarıyla birlikte signal_log'a tamponlanır)
             signal, confidence = controller.signal_generator.generate_signal(
                 current_price, 
-                results['predicted_price'], 
+                results['predicted_path'], 
                 results['sentiment_score'], 
                 results['dataframe'],
-                trader.trade_history
+                trader.ledger.summary(),
+                symbol=symbol,
+                timestamp=timestamp
             )
+            signal_time = time.perf_counter()  # Sinyal -> emir gecikmesi bu andan ölçülür
+            signals = {symbol: (signal, confidence)}
+            prices = {symbol: current_price}
+            timestamps = {symbol: timestamp}
+
+            for other in scan_symbols[1:]:
+                other_results = controller.run_analysis(other)
+                if "error" in other_results:
+                    continue
+                prices[other] = other_results['current_price']
+                timestamps[other] = other_results['dataframe']['timestamp'].iloc[-1]
+                signals[other] = controller.signal_generator.generate_signal(
+                    other_results['current_price'], other_results['predicted_path'],
+                    other_results['sentiment_score'], other_results['dataframe'], trader.ledger.summary(),
+                    symbol=other, timestamp=timestamps[other])
             
-            timestamp = results['dataframe']['timestamp'].iloc[-1]
-            
-            # İşlem Denemesi
-            is_traded, log_msg = trader.execute_trade(signal, symbol, current_price, timestamp)
+            # İşlem Denemesi: REAL modda önceki emirlerin dolumları işlenir (bloklamaz),
+            # sonra tüm paritelerin sinyalleri sermaye dağıtımıyla birlikte işlenir
+            fill_logs = trader.poll_orders()
+            trade_results = trader.execute_signals(signals, prices, timestamps, signal_time)
+            is_traded, log_msg = trade_results[symbol]
             
             usdt_bal, coin_bal = trader.get_balances(symbol)
-            total_val = usdt_bal + (coin_bal * current_price)
+            total_val, _ = trader.equity(prices)
             
             # METRİKLER (Anlık Fiyat Eklendi)
             with metric_place.container():
@@ -116,9 +165,24 @@ if st.session_state.is_running:
             fig.add_trace(go.Candlestick(x=formatted_dates, open=df['open'], high=df['high'],
                             low=df['low'], close=df['close'], name='Fiyat'), row=1, col=1)
             
-            fig.add_trace(go.Scatter(x=formatted_dates.tail(20), y=[results['predicted_price']]*20, 
-                                     name='ML Tahmini', line=dict(color='orange', dash='dot')), row=1, col=1)
+            # ML tahmin yolu: son kapanıştan başlayıp T+1 ... T+K mumlarına uzanır
+            path = results['predicted_path']
+            step = int(df['timestamp'].iloc[-1] - df['timestamp'].iloc[-2])
+            path_ts = df['timestamp'].iloc[-1] + step * np.arange(len(path) + 1)
+            fig.add_trace(go.Scatter(x=pd.to_datetime(path_ts, unit='ms'), y=np.r_[current_price, path],
+                                     name=f'ML Tahmini (T+1…T+{len(path)})',
+                                     line=dict(color='orange', dash='dot')), row=1, col=1)
             
+            # Grafik penceresindeki geçmiş AL/SAT kararları (hizalı diziler, DB + tampon)
+            history = controller.signal_log.history(symbol, start=int(df['timestamp'].iloc[0]))
+            for code, name, color, marker in ((1, 'AL Sinyali', 'green', 'triangle-up'),
+                                              (-1, 'SAT Sinyali', 'red', 'triangle-down')):
+                mask = history['signal'] == code
+                if mask.any():
+                    fig.add_trace(go.Scatter(x=pd.to_datetime(history['timestamp'][mask], unit='ms'),
+                                             y=history['price'][mask], mode='markers', name=name,
+                                             marker=dict(color=color, symbol=marker, size=10)), row=1, col=1)
+
             fig.add_trace(go.Scatter(x=formatted_dates, y=df['rsi_14'], name='RSI', line=dict(color='purple')), row=2, col=1)
             fig.add_hline(y=70, line_dash="dash", line_color="red", row=2, col=1)
             fig.add_hline(y=30, line_dash="dash", line_color="green", row=2, col=1)
@@ -135,16 +199,26 @@ if st.session_state.is_running:
             chart_place.plotly_chart(fig, width="stretch", key=f"chart_{int(time.time())}")
             
             with log_place:
+                for fill_log in fill_logs:
+                    st.success(fill_log)
+                for other, (other_traded, other_log) in trade_results.items():
+                    if other != symbol and other_traded:
+                        st.success(f"İŞLEM YAPILDI: {other_log}")
+                open_positions = trader.portfolio.open_symbols()
+                if open_positions:
+                    st.caption("Açık pozisyonlar: " + ", ".join(open_positions))
+                if trader.last_latency:
+                    st.caption(" | ".join(f"{k}: {v:.0f}" for k, v in trader.last_latency.items()))
                 if is_traded: 
                     st.success(f"İŞLEM YAPILDI: {log_msg}")
                 else:
                     if signal == "HOLD":
                         reason = "Sinyal Nötr (HOLD) / Yetersiz Güven Skoru"
                         icon = "⏳"
-                    elif trader.in_position and signal == "BUY":
+                    elif trader.in_position(symbol) and signal == "BUY":
                         reason = "Zaten Alım Yapılmış"
                         icon = "🔒"
-                    elif not trader.in_position and signal == "SELL":
+                    elif not trader.in_position(symbol) and signal == "SELL":
                         reason = "Satılacak Coin Yok"
                         icon = "🚫"
                     else:
@@ -153,11 +227,20 @@ if st.session_state.is_running:
                         
                     st.info(f"{icon} Durum: Beklemede... Sebep: {reason}")
 
+            # İşlem geçmişi: tüm liste yerine sadece seçili sayfa + O(1) özet çizilir
+            with history_place.container():
                 st.subheader("📜 İşlem Geçmişi")
-                if not trader.trade_history:
+                stats = trader.ledger.summary()
+                h1, h2, h3 = st.columns(3)
+                h1.metric("Kazanma Oranı", "-" if stats['win_rate'] is None else f"%{stats['win_rate'] * 100:.1f}")
+                h2.metric("Toplam P/L", f"${stats['total_pnl']:.2f}")
+                h3.metric("Maks. Düşüş", f"${stats['max_drawdown']:.2f}")
+                if len(trader.ledger) == 0:
                     st.text("Henüz işlem kaydı yok.")
-                for log in reversed(trader.trade_history):
-                    st.code(log)
+                else:
+                    page = min(history_page, trader.ledger.num_pages(HISTORY_PAGE_SIZE)) - 1
+                    st.dataframe(trader.ledger.page(page, HISTORY_PAGE_SIZE), hide_index=True)
+                    st.caption(f"Sayfa {page + 1}/{trader.ledger.num_pages(HISTORY_PAGE_SIZE)}")
             
             time.sleep(60)
             
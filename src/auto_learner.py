@@ -1,44 +1,122 @@
+import os
 import time
+import queue
 import schedule
-from model_trainer import ModelTrainer
+import multiprocessing as mp
 from datetime import datetime
 
+QUEUE_POLL_SECONDS = 1.0  # İşçi süreç sonucu beklenirken canlılık kontrol aralığı
+
+
+def _limit_threads(intra_op_threads, inter_op_threads, niceness):
+    """
+    Eğitim sürecinin CPU kullanımını sınırlar. Ortam değişkenleri tensorflow
+    import edilmeden ÖNCE ayarlanmalı; bu yüzden işçi süreç 'spawn' ile başlar.
+    """
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"):
+        os.environ[var] = str(intra_op_threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op_threads)
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)  # Canlı trade sürecine CPU önceliği bırak
+
+
+def _retrain_worker(symbol, limit, epochs, mode, max_seconds, intra_op_threads, inter_op_threads,
+                    niceness, result_queue):
+    """Ayrı süreçte çalışan eğitim işi: veri çek, aday eğit, doğrula, yayına al."""
+    try:
+        _limit_threads(intra_op_threads, inter_op_threads, niceness)
+        from model_trainer import ModelTrainer
+
+        trainer = ModelTrainer(symbol=symbol, limit=limit)
+        df = trainer.fetch_historical_data()
+        if df.empty:
+            result_queue.put({'promoted': False, 'reason': "Veri çekilemedi"})
+            return
+
+        df = trainer.add_features(df)
+        print(f"🏋️‍♂️ Model {symbol} piyasa verisiyle antrenman yapıyor ({mode})...")
+        if mode == 'incremental':
+            result = trainer.fine_tune_incremental(df, epochs=epochs, batch_size=32, max_seconds=max_seconds)
+        else:
+            result = trainer.train_candidate(df, epochs=epochs, batch_size=32)
+        result_queue.put(result)
+    except Exception as e:
+        result_queue.put({'promoted': False, 'reason': f"Eğitim hatası: {e}"})
+
+
 class AutoLearner:
     """
     Modelin sürekli güncel kalmasını sağlayan Otomatik Öğrenme Modülü.
+    Eğitim ayrı bir süreçte, sınırlı thread ile yapılır; yeni model ancak
+    holdout doğrulamasını geçerse atomik olarak yayına alınır.
+    mode='incremental' (varsayılan) sadece yeni mumlar + replay ile ince ayar
+    yapar; mode='full' tüm pencereyle eğitir.
     """
     # VARSAYILAN PARİTE AVAX OLARAK DEĞİŞTİRİLDİ
-    def __init__(self, symbol='AVAX/USDT'): 
+    def __init__(self, symbol='AVAX/USDT', limit=2000, epochs=5, mode='incremental', max_seconds=60,
+                 intra_op_threads=2, inter_op_threads=1, niceness=10, timeout_minutes=30):
         self.symbol = symbol
-        self.trainer = ModelTrainer(symbol=symbol, limit=2000)
+        self.limit = limit
+        self.epochs = epochs
+        self.mode = mode
+        self.max_seconds = max_seconds
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.niceness = niceness
+        self.timeout_minutes = timeout_minutes
+        self._ctx = mp.get_context("spawn")
 
     def job(self):
         print(f"\n🧠 [AUTO-LEARN] Otomatik eğitim başladı: {datetime.now()}")
-        try:
-            df = self.trainer.fetch_historical_data()
-            if df.empty:
-                print("⚠️ Veri çekilemedi, eğitim atlandı.")
-                return
-
-            df = self.trainer.add_features(df)
-            X, y, scaler = self.trainer.ml_manager.prepare_data(df, lookback=60, is_training=True)
-            
-            from ml_models import LSTMModel
-            lstm = LSTMModel(input_shape=(X.shape[1], X.shape[2]))
-            
-            print(f"🏋️‍♂️ Model {self.symbol} piyasa verisiyle antrenman yapıyor...")
-            lstm.train(X, y, epochs=5, batch_size=32)
-            
-            print(f"✅ {self.symbol} Modeli başarıyla güncellendi ve kaydedildi!")
-            
-        except Exception as e:
-            print(f"❌ Eğitim hatası: {e}")
+        result_queue = self._ctx.Queue()
+        worker = self._ctx.Process(
+            target=_retrain_worker,
+            args=(self.symbol, self.limit, self.epochs, self.mode, self.max_seconds, self.intra_op_threads,
+                  self.inter_op_threads, self.niceness, result_queue),
+            daemon=True,
+        )
+        worker.start()
+        result = self._wait_result(worker, result_queue)
+        worker.join()
+
+        if result.get('promoted'):
+            print(f"✅ {self.symbol} Modeli doğrulandı ve v{result['version']} olarak yayına alındı!")
+        else:
+            print(f"⚠️ Model yayına alınmadı: {result.get('reason')}")
+        return result
+
+    def _wait_result(self, worker, result_queue):
+        """
+        Kuyruğu kısa aralıklarla yoklar. İşçi sonuç yazmadan ölürse (segfault,
+        OOM kill, TF abort) zaman aşımı beklenmeden exitcode ile raporlanır.
+        """
+        deadline = time.monotonic() + self.timeout_minutes * 60
+        while True:
+            try:
+                return result_queue.get(timeout=QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                pass
+            if not worker.is_alive():
+                try:
+                    # Süreç sonucu yazıp hemen çıkmış olabilir
+                    return result_queue.get(timeout=QUEUE_POLL_SECONDS)
+                except queue.Empty:
+                    return {'promoted': False,
+                            'reason': f"Eğitim süreci sonuç vermeden sonlandı (exitcode={worker.exitcode})"}
+            if time.monotonic() >= deadline:
+                worker.terminate()
+                return {'promoted': False, 'reason': "Zaman aşımı"}
 
     def start(self, interval_minutes=60):
         print(f"🕒 Otomatik Öğrenme Modülü Başlatıldı. ({interval_minutes} dakikada bir eğitilecek)")
         self.job()
         schedule.every(interval_minutes).minutes.do(self.job)
-        
+
         while True:
             schedule.run_pending()
             time.sleep(1)
@@ -46,4 +124,4 @@ class AutoLearner:
 if __name__ == "__main__":
     # SADECE AVAX İÇİN ÇALIŞTIRILIYOR
     learner = AutoLearner(symbol='AVAX/USDT')
-    learner.start(interval_minutes=60)
\ No newline at end of file
+    learner.start(interval_minutes=60)
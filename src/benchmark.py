@@ -0,0 +1,444 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_RESULTS_PATH = "data/benchmarks/latest.json"
+DEFAULT_BASELINE_PATH = "data/benchmarks/baseline.json"
+DEFAULT_IMPORT_MODULES = ["main_controller", "auto_learner"]
+
+STAGES = [
+    "insert_ohlcv",
+    "get_all_indicators",
+    "prepare_data",
+    "lstm_inference",
+    "aggregate_scores",
+    "generate_signal",
+    "run_analysis",
+]
+
+# Toplam mum sayısı bunun altındaysa fixture'lar bellekte tutulur; üstündeyse
+# (örn. 1M mum x 500 sembol ~ 24 GB) her sembolün verisi ihtiyaç anında yeniden üretilir
+FRAME_CACHE_BARS = 5_000_000
+
+NEWS_WORDS = ["bitcoin", "surge", "plunge", "bullish", "bearish", "hack", "ath",
+              "pump", "dump", "market", "ETF", "regulation", "moon", "fud", "rally"]
+
+
+# --- SENTETİK VERİ (FIXTURE) ÜRETİCİLERİ ---
+
+def make_ohlcv(n_bars, seed=0, start_ts=1_600_000_000_000, step_ms=3_600_000):
+    """
+    Rastgele yürüyüş (random walk) ile borsa formatında OHLCV DataFrame'i üretir.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.005, n_bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.uniform(10, 1000, n_bars)
+    timestamp = start_ts + np.arange(n_bars, dtype=np.int64) * step_ms
+
+    return pd.DataFrame({
+        'timestamp': timestamp, 'open': open_, 'high': high,
+        'low': low, 'close': close, 'volume': volume
+    })
+
+
+def make_news(n_items, seed=0):
+    """
+    NewsScraper.fetch_news çıktısıyla aynı formatta sahte haber listesi üretir.
+    """
+    rng = np.random.default_rng(seed)
+    now = int(datetime.now().timestamp())
+    news = []
+    for i in range(n_items):
+        title = " ".join(rng.choice(NEWS_WORDS, size=8))
+        news.append({'title': title, 'content': title, 'source': 'Bench', 'published_date': now + i})
+    return news
+
+
+class _FixtureCollector:
+    """Borsaya gitmeden sabit veriyi dönen collector (run_analysis ölçümü için)."""
+    def __init__(self, frame_fn):
+        self.frame_fn = frame_fn
+
+    def fetch_ohlcv(self, symbol, timeframe='1h', limit=100):
+        return self.frame_fn(symbol).copy()
+
+
+class _FixtureScraper:
+    """Ağa çıkmadan sabit haber listesini dönen scraper."""
+    def __init__(self, news):
+        self.news = news
+
+    def fetch_news(self):
+        return self.news
+
+
+# --- ÖLÇÜM ---
+
+def _summarize(samples, items):
+    """Süre örneklerinden yüzdelik gecikme ve throughput özetini çıkarır."""
+    arr = np.array(samples) * 1000.0  # ms
+    total_s = float(np.sum(samples))
+    return {
+        'runs': len(samples),
+        'mean_ms': float(arr.mean()),
+        'p50_ms': float(np.percentile(arr, 50)),
+        'p90_ms': float(np.percentile(arr, 90)),
+        'p99_ms': float(np.percentile(arr, 99)),
+        'max_ms': float(arr.max()),
+        'throughput_per_s': (items * len(samples)) / total_s if total_s > 0 else 0.0,
+    }
+
+
+def measure(fn, repeat, items=1, warmup=1):
+    """
+    fn'i warmup + repeat kez çalıştırır. Gecikme yüzdelikleri, throughput
+    (saniyede işlenen öğe) ve tepe bellek kullanımını döner.
+    fn bir sayı dönerse o süre (saniye) örnek olarak kullanılır; böylece
+    fixture üretimi gibi hazırlıklar ölçüme katılmaz.
+    Tepe bellek, tracemalloc yükü süreleri bozmasın diye ayrı ve
+    zamanlanmayan son bir çalıştırmada ölçülür.
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        elapsed = fn()
+        samples.append(elapsed if elapsed is not None else time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = _summarize(samples, items)
+    result['peak_mem_mb'] = peak / (1024 * 1024)
+    return result
+
+
+# --- BENCHMARK SENARYOSU ---
+
+class PipelineBenchmark:
+    """
+    Analiz hattının her aşamasını sentetik veriyle ayrı ayrı ölçer.
+    Ağ erişimi yapılmaz, gerçek veritabanı ve scaler dosyalarına dokunulmaz.
+    """
+    def __init__(self, n_bars=1000, n_symbols=1, n_news=20, repeat=5, workdir=None):
+        self.n_bars = n_bars
+        self.n_symbols = n_symbols
+        self.n_news = n_news
+        self.repeat = repeat
+        self.workdir = workdir or tempfile.mkdtemp(prefix="crypto_bench_")
+
+        self.symbols = [f"SYM{i}/USDT" for i in range(n_symbols)]
+        self._seeds = {s: i for i, s in enumerate(self.symbols)}
+        self._frames = {} if n_bars * n_symbols <= FRAME_CACHE_BARS else None
+        self.news = make_news(n_news)
+
+    def frame(self, symbol):
+        """Sembolün fixture verisi; büyük senaryolarda bellekte tutulmaz, tekrar üretilir."""
+        if self._frames is None:
+            return make_ohlcv(self.n_bars, seed=self._seeds[symbol])
+        if symbol not in self._frames:
+            self._frames[symbol] = make_ohlcv(self.n_bars, seed=self._seeds[symbol])
+        return self._frames[symbol]
+
+    def _per_symbol(self, work):
+        """
+        Her sembol için fixture'ı (zamanlamadan) hazırlayıp sadece work(symbol, df)
+        süresini toplayan bir run fonksiyonu döner; bellekte tek sembolün verisi bulunur.
+        """
+        def run():
+            elapsed = 0.0
+            for s in self.symbols:
+                df = self.frame(s)
+                t0 = time.perf_counter()
+                work(s, df)
+                elapsed += time.perf_counter() - t0
+            return elapsed
+        return run
+
+    def _fresh_db(self, name):
+        """Singleton DatabaseManager'ı geçici bir dosyaya yönlendirir."""
+        from database_manager import DatabaseManager
+        DatabaseManager._instance = None
+        return DatabaseManager(db_path=os.path.join(self.workdir, name))
+
+    def bench_insert_ohlcv(self):
+        counter = {'run': 0}
+
+        def run():
+            # Her turda boş DB: UNIQUE çakışması yerine gerçek yazma maliyeti ölçülsün
+            counter['run'] += 1
+            db = self._fresh_db(f"insert_{counter['run']}.db")
+            return self._per_symbol(lambda s, df: db.insert_ohlcv(df, s))()
+
+        return measure(run, self.repeat, items=self.n_bars * self.n_symbols)
+
+    def bench_get_all_indicators(self):
+        from technical_analysis import TechnicalAnalysis
+
+        run = self._per_symbol(lambda s, df: TechnicalAnalysis(df).get_all_indicators())
+        return measure(run, self.repeat, items=self.n_bars * self.n_symbols)
+
+    def _ml_manager(self):
+        from ml_models import MLManager
+        manager = MLManager()
+        manager.scaler_path = os.path.join(self.workdir, "scaler.save")
+        return manager
+
+    def bench_prepare_data(self):
+        manager = self._ml_manager()
+
+        run = self._per_symbol(lambda s, df: manager.prepare_data(df, is_training=True))
+        return measure(run, self.repeat, items=self.n_bars * self.n_symbols)
+
+    def bench_lstm_inference(self):
+        from ml_models import LSTMModel
+        manager = self._ml_manager()
+        manager.prepare_data(self.frame(self.symbols[0]), is_training=True)
+        # Her sembol için sadece son pencere (1, lookback, F) tutulur
+        batches = [manager.prepare_data(self.frame(s), is_training=False)[0] for s in self.symbols]
+        lstm = LSTMModel(input_shape=(batches[0].shape[1], batches[0].shape[2]))
+
+        def run():
+            for X in batches:
+                lstm.predict(X)
+
+        return measure(run, self.repeat, items=self.n_symbols)
+
+    def bench_aggregate_scores(self):
+        from sentiment_analysis import SentimentAnalysis
+        analyzer = SentimentAnalysis()
+        texts = [n['title'] for n in self.news]
+
+        return measure(lambda: analyzer.aggregate_scores(texts), self.repeat, items=len(texts))
+
+    def bench_generate_signal(self):
+        from technical_analysis import TechnicalAnalysis
+        from signal_generator import HybridSignalGenerator
+        generator = HybridSignalGenerator()
+        # generate_signal sadece son satırlara bakar; tüm indikatör tabloları tutulmaz
+        analyzed = [TechnicalAnalysis(self.frame(s)).get_all_indicators().tail(5) for s in self.symbols]
+
+        def run():
+            for df in analyzed:
+                price = df['close'].iloc[-1]
+                generator.generate_signal(price, price * 1.01, 0.1, df)
+
+        return measure(run, self.repeat, items=self.n_symbols)
+
+    def bench_run_analysis(self):
+        from main_controller import MainController
+        self._fresh_db("controller.db")
+        controller = MainController()
+        controller.collector = _FixtureCollector(self.frame)
+        controller.news_scraper = _FixtureScraper(self.news)
+
+        def run():
+            for s in self.symbols:
+                controller.run_analysis(s)
+
+        return measure(run, self.repeat, items=self.n_symbols)
+
+    def run(self, stages=None):
+        results = {}
+        for stage in stages or STAGES:
+            bench = getattr(self, f"bench_{stage}")
+            try:
+                results[stage] = bench()
+                print(f"⏱️  {stage}: p50={results[stage]['p50_ms']:.2f}ms "
+                      f"p99={results[stage]['p99_ms']:.2f}ms "
+                      f"peak={results[stage]['peak_mem_mb']:.1f}MB")
+            except ImportError as e:
+                # Opsiyonel bağımlılık (örn. tensorflow) yoksa aşama atlanır
+                results[stage] = {'skipped': f"Eksik bağımlılık: {e}"}
+                print(f"⏭️  {stage} atlandı: {e}")
+        return results
+
+
+# --- AÇILIŞ (IMPORT) SÜRESİ ---
+
+def measure_import_time(module, runs=3, top=10):
+    """
+    `python -X importtime -c "import <module>"` ile soğuk açılış süresini ölçer.
+    Her çalıştırma ayrı süreçte yapılır; en iyi (min) kümülatif süre ve
+    en pahalı alt importlar döner. Eksik bağımlılıkta ImportError fırlatır;
+    süreç başka bir nedenle çökerse veya çıktı okunamazsa {'failed': neden} döner.
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    best_us, best_rows = None, []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              cwd=src_dir, capture_output=True, text=True)
+        lines = proc.stderr.strip().splitlines()
+        if proc.returncode != 0:
+            errors = [line for line in lines if not line.startswith("import time:")]
+            reason = errors[-1] if errors else f"çıkış kodu {proc.returncode}, hata çıktısı yok"
+            if reason.startswith("ModuleNotFoundError"):
+                raise ImportError(reason)
+            return {'failed': reason}
+
+        rows = []
+        for line in lines:
+            # "import time:       self [us] |  cumulative | imported package"
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            _, self_us, cum_us, name = (p.strip() for p in line.replace("import time:", "|").split("|"))
+            rows.append((name, int(self_us), int(cum_us)))
+
+        total_us = next((cum for name, _, cum in rows if name == module), None)
+        if total_us is None:
+            return {'failed': f"-X importtime çıktısında {module} bulunamadı"}
+        if best_us is None or total_us < best_us:
+            best_us, best_rows = total_us, rows
+
+    heaviest = sorted(best_rows, key=lambda r: -r[2])[:top]
+    return {
+        'cumulative_ms': best_us / 1000.0,
+        'heaviest': [{'module': name, 'cumulative_ms': cum / 1000.0} for name, _, cum in heaviest],
+    }
+
+
+# --- RAPOR VE KARŞILAŞTIRMA ---
+
+def save_results(report, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Sonuçlar kaydedildi: {path}")
+
+
+def compare_to_baseline(report, baseline, tolerance=0.20, metric='p50_ms'):
+    """
+    Aynı senaryo (bar x sembol) ve aşama için baseline'a göre metric'in
+    tolerance oranından fazla kötüleştiği durumları liste olarak döner.
+    """
+    regressions = []
+    for scenario, stages in report['scenarios'].items():
+        base_stages = baseline.get('scenarios', {}).get(scenario, {})
+        for stage, stats in stages.items():
+            base = base_stages.get(stage)
+            if not base or metric not in stats or metric not in base:
+                continue
+            if base[metric] > 0 and stats[metric] > base[metric] * (1 + tolerance):
+                regressions.append({
+                    'scenario': scenario, 'stage': stage,
+                    'baseline': base[metric], 'current': stats[metric],
+                    'ratio': stats[metric] / base[metric],
+                })
+    return regressions
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analiz hattı performans ölçümü")
+    parser.add_argument("--bars", type=_int_list, default=[1000],
+                        help="Virgülle ayrılmış mum sayıları (örn. 1000,100000,1000000)")
+    parser.add_argument("--symbols", type=_int_list, default=[1],
+                        help="Virgülle ayrılmış sembol sayıları (örn. 1,50,500)")
+    parser.add_argument("--news", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--stages", type=lambda v: v.split(","), default=None,
+                        help=f"Ölçülecek aşamalar ({','.join(STAGES)})")
+    parser.add_argument("--output", default=DEFAULT_RESULTS_PATH)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="İzin verilen yavaşlama oranı (0.20 = %%20)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Bu çalıştırmayı yeni baseline olarak kaydet")
+    parser.add_argument("--importtime", type=lambda v: v.split(","), default=None,
+                        help=f"Açılış süresi ölçülecek modüller (örn. {','.join(DEFAULT_IMPORT_MODULES)}); "
+                             "--stages ile birlikte verilmezse sadece açılış ölçülür")
+    parser.add_argument("--import-budget-ms", type=float, default=1500.0,
+                        help="Modül başına izin verilen soğuk import süresi")
+    args = parser.parse_args(argv)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'scenarios': {},
+    }
+
+    budget_failures = []
+    if args.importtime:
+        report['import_time'] = {}
+        for module in args.importtime:
+            try:
+                stats = measure_import_time(module)
+            except ImportError as e:
+                report['import_time'][module] = {'skipped': f"Eksik bağımlılık: {e}"}
+                print(f"⏭️  import {module} atlandı: {e}")
+                continue
+            report['import_time'][module] = stats
+            if 'failed' in stats:
+                print(f"❌ import {module} ölçülemedi: {stats['failed']}")
+                budget_failures.append(module)
+                continue
+            within = stats['cumulative_ms'] <= args.import_budget_ms
+            print(f"{'✅' if within else '❌'} import {module}: {stats['cumulative_ms']:.1f}ms "
+                  f"(bütçe {args.import_budget_ms:.0f}ms)")
+            if not within:
+                budget_failures.append(module)
+                for row in stats['heaviest'][:5]:
+                    print(f"    {row['module']}: {row['cumulative_ms']:.1f}ms")
+        if args.stages is None:
+            # --stages verilmediyse sadece açılış ölçümü yapılır
+            save_results(report, args.output)
+            return 1 if budget_failures else 0
+
+    for n_bars in args.bars:
+        for n_symbols in args.symbols:
+            scenario = f"{n_bars}x{n_symbols}"
+            print(f"\n📊 Senaryo: {n_bars} mum x {n_symbols} sembol")
+            bench = PipelineBenchmark(n_bars=n_bars, n_symbols=n_symbols,
+                                      n_news=args.news, repeat=args.repeat)
+            report['scenarios'][scenario] = bench.run(args.stages)
+
+    save_results(report, args.output)
+
+    if args.save_baseline:
+        save_results(report, args.baseline)
+        return 1 if budget_failures else 0
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️ Baseline dosyası yok, karşılaştırma atlandı (--save-baseline ile oluşturun).")
+        return 1 if budget_failures else 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare_to_baseline(report, baseline, tolerance=args.tolerance)
+    if not regressions:
+        print("✅ Baseline'a göre performans gerilemesi yok.")
+        return 1 if budget_failures else 0
+
+    for r in regressions:
+        print(f"❌ GERİLEME [{r['scenario']}] {r['stage']}: "
+              f"{r['baseline']:.2f}ms -> {r['current']:.2f}ms (x{r['ratio']:.2f})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import time
+import atexit
+import numpy as np
+
+
+class BufferedLog:
+    """
+    Satırları numpy structured array'de biriktirip DB'ye toplu (batch) yazan
+    günlüklerin (TradeLedger, SignalLog) ortak tabanı.
+
+    - Semboller int32 kimliklerle tutulur (_symbol_id).
+    - Kapasite doldukça ikiye katlanır; ekleme amortize O(1).
+    - Bekleyen satırlar flush_every satıra ulaşınca veya flush_interval saniye
+      geçince tek transaction ile yazılır; süreç kapanırken (atexit) kalanlar da yazılır.
+    - keep_flushed=False ise yazılan satırlar tampondan atılır (sadece bekleyenler tutulur).
+
+    Alt sınıflar DTYPE, _db_rows() ve _write() tanımlar.
+    """
+    DTYPE = None
+    keep_flushed = True
+
+    def __init__(self, capacity, db_manager=None, flush_every=20, flush_interval=60):
+        self._rows = np.zeros(capacity, dtype=self.DTYPE)
+        self._n = 0
+        self._flushed = 0
+        self.symbols = []
+        self._symbol_ids = {}
+
+        self.db_manager = db_manager
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        if db_manager is not None:
+            atexit.register(self.flush)
+
+    def __len__(self):
+        return self._n
+
+    def _symbol_id(self, symbol):
+        if symbol not in self._symbol_ids:
+            self._symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return self._symbol_ids[symbol]
+
+    def _append(self, row):
+        """Satırı ekler (gerekirse tamponu büyütür); eşik aşıldıysa DB'ye yazar."""
+        if self._n == len(self._rows):
+            grown = np.zeros(len(self._rows) * 2, dtype=self.DTYPE)
+            grown[:self._n] = self._rows[:self._n]
+            self._rows = grown
+        self._rows[self._n] = row
+        self._n += 1
+
+        if (self._n - self._flushed >= self.flush_every or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def pending(self):
+        """Henüz DB'ye yazılmamış satırların (kopyasız) görünümü."""
+        return self._rows[self._flushed:self._n]
+
+    def _db_rows(self, pending):
+        raise NotImplementedError
+
+    def _write(self, rows):
+        raise NotImplementedError
+
+    def flush(self):
+        """Bekleyen satırları tek transaction ile yazar. Dönüş: yazılan satır sayısı."""
+        self._last_flush = time.monotonic()
+        if self.db_manager is None or self._flushed == self._n:
+            return 0
+        rows = self._db_rows(self.pending())
+        if not self._write(rows):
+            return 0  # Bir sonraki flush'ta tekrar denenir
+        if self.keep_flushed:
+            self._flushed = self._n
+        else:
+            self._n = self._flushed = 0
+        return len(rows)
@@ -0,0 +1,268 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+DTYPES = {
+    'timestamp': np.float64,  # ms cinsinden epoch; float64 2^53'e kadar tam sayıyı kayıpsız tutar
+    'open': np.float32, 'high': np.float32, 'low': np.float32,
+    'close': np.float32, 'volume': np.float32,
+}
+
+
+class ColumnarCandleStore:
+    """
+    Sembol/zaman dilimi başına, kolon kolon (columnar) tutulan ve sadece
+    sona ekleme (append-only) yapılan mum deposu.
+
+    Dizin yapısı: <root>/<BTC_USDT>/<1h>/{timestamp.f64, open.f32, ..., meta.json}
+    Okumalar np.memmap ile yapılır: dosya RAM'e kopyalanmaz, işletim sistemi
+    sadece dokunulan sayfaları yükler. Tek yazıcı (single writer) varsayılır.
+    """
+    def __init__(self, root="data/candles"):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    # --- YOL YARDIMCILARI ---
+
+    def _dir(self, symbol, timeframe):
+        return os.path.join(self.root, symbol.replace('/', '_'), timeframe)
+
+    def _col_path(self, symbol, timeframe, col):
+        ext = 'f64' if DTYPES[col] == np.float64 else 'f32'
+        return os.path.join(self._dir(symbol, timeframe), f"{col}.{ext}")
+
+    def _meta_path(self, symbol, timeframe):
+        return os.path.join(self._dir(symbol, timeframe), "meta.json")
+
+    def _read_meta(self, symbol, timeframe):
+        path = self._meta_path(symbol, timeframe)
+        if not os.path.exists(path):
+            return {'sorted': True}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, symbol, timeframe, meta):
+        path = self._meta_path(symbol, timeframe)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def _row_count(self, symbol, timeframe):
+        """
+        Kolonlardaki en kısa uzunluk. Yazma sırasında çökme olursa kolonlar
+        farklı uzunlukta kalabilir; yarım satırlar böylece görmezden gelinir.
+        """
+        counts = []
+        for col in COLUMNS:
+            path = self._col_path(symbol, timeframe, col)
+            if not os.path.exists(path):
+                return 0
+            counts.append(os.path.getsize(path) // np.dtype(DTYPES[col]).itemsize)
+        return min(counts)
+
+    # --- LİSTELEME ---
+
+    def list_series(self):
+        """Depodaki (symbol, timeframe) çiftlerini döner."""
+        series = []
+        if not os.path.isdir(self.root):
+            return series
+        for sym_dir in sorted(os.listdir(self.root)):
+            sym_path = os.path.join(self.root, sym_dir)
+            if not os.path.isdir(sym_path):
+                continue
+            for tf in sorted(os.listdir(sym_path)):
+                if os.path.isdir(os.path.join(sym_path, tf)):
+                    series.append((sym_dir.replace('_', '/', 1), tf))
+        return series
+
+    # --- YAZMA ---
+
+    def append(self, symbol, timeframe, df):
+        """
+        DataFrame'deki mumları sona ekler ve yazılan (eklenen + güncellenen) satır sayısını döner.
+        Seri her zaman sıralı ve tekil kalır:
+        - Son kayıtla aynı damga (henüz kapanmamış mum) yerinde güncellenir.
+        - Son kayıttan yeni damgalar sona eklenir (hızlı yol).
+        - Son kayıttan eski damgalar (geriye dönük doldurma, import_from_sqlite)
+          atılmaz: parça sona yazılır ve seri compact() ile birleştirilir; aynı
+          damgada gelen satır depodakinin yerine geçer.
+        """
+        if df is None or len(df) == 0:
+            return 0
+
+        os.makedirs(self._dir(symbol, timeframe), exist_ok=True)
+        if not self._read_meta(symbol, timeframe).get('sorted', True):
+            # Eski sürümde sırasız yazılmış seri: bir kereye mahsus yazma tarafında düzeltilir
+            self.compact(symbol, timeframe)
+        n = self._row_count(symbol, timeframe)
+        self._truncate(symbol, timeframe, n)
+
+        new = {col: np.ascontiguousarray(df[col].to_numpy(), dtype=DTYPES[col]) for col in COLUMNS}
+        ts = new['timestamp']
+        if np.any(np.diff(ts) <= 0):
+            # Gelen parça sırasız/tekrarlı: sırala, aynı damgada en son satır kalsın
+            rev = np.argsort(ts[::-1], kind='stable')
+            _, first = np.unique(ts[::-1][rev], return_index=True)
+            keep = (len(ts) - 1) - rev[first]
+            new = {col: arr[keep] for col, arr in new.items()}
+            ts = new['timestamp']
+
+        updated = 0
+        if n > 0:
+            last_ts = self._last_timestamp(symbol, timeframe, n)
+            if ts[0] < last_ts:
+                # Geriye dönük parça: önce sırasız diye işaretlenir (yazma yarıda kalırsa
+                # bir sonraki append düzeltir), sonra birleştirilir
+                self._write_meta(symbol, timeframe, {'sorted': False})
+                for col in COLUMNS:
+                    with open(self._col_path(symbol, timeframe, col), "ab") as f:
+                        new[col].tofile(f)
+                self.compact(symbol, timeframe)
+                return len(ts)
+
+            i = int(np.searchsorted(ts, last_ts, side='left'))
+            if i < len(ts) and ts[i] == last_ts:
+                # Canlı mum güncellemesi: son satırın üzerine yaz
+                for col in COLUMNS:
+                    mm = np.memmap(self._col_path(symbol, timeframe, col), dtype=DTYPES[col], mode='r+',
+                                   offset=(n - 1) * np.dtype(DTYPES[col]).itemsize, shape=(1,))
+                    mm[0] = new[col][i]
+                    mm.flush()
+                    del mm
+                updated = 1
+                i += 1
+            new = {col: arr[i:] for col, arr in new.items()}
+            ts = new['timestamp']
+
+        if len(ts):
+            for col in COLUMNS:
+                with open(self._col_path(symbol, timeframe, col), "ab") as f:
+                    new[col].tofile(f)
+        if n == 0:
+            self._write_meta(symbol, timeframe, {'sorted': True})
+        return updated + len(ts)
+
+    def _last_timestamp(self, symbol, timeframe, n):
+        return float(np.memmap(self._col_path(symbol, timeframe, 'timestamp'),
+                               dtype=np.float64, mode='r', offset=(n - 1) * 8, shape=(1,))[0])
+
+    def _truncate(self, symbol, timeframe, n_rows):
+        """Yarım kalmış yazmalardan sonra kolonları ortak uzunluğa keser."""
+        for col in COLUMNS:
+            path = self._col_path(symbol, timeframe, col)
+            size = n_rows * np.dtype(DTYPES[col]).itemsize
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    def compact(self, symbol, timeframe):
+        """
+        Seriyi zaman damgasına göre sıralar, tekrar eden damgalarda en son
+        yazılanı tutar ve dosyaları atomik olarak (os.replace) değiştirir.
+        """
+        n = self._row_count(symbol, timeframe)
+        if n == 0:
+            return 0
+
+        cols = self._memmap_columns(symbol, timeframe, n)
+        ts = cols['timestamp']
+        # Ters çevirip stable sort + unique: aynı damgada en son eklenen kazanır
+        rev_order = np.argsort(ts[::-1], kind='stable')
+        _, first_idx = np.unique(ts[::-1][rev_order], return_index=True)
+        keep = (n - 1) - rev_order[first_idx]
+
+        for col in COLUMNS:
+            path = self._col_path(symbol, timeframe, col)
+            tmp = path + ".tmp"
+            np.ascontiguousarray(cols[col][keep]).tofile(tmp)
+        del cols, ts
+        for col in COLUMNS:
+            path = self._col_path(symbol, timeframe, col)
+            os.replace(path + ".tmp", path)
+
+        self._write_meta(symbol, timeframe, {'sorted': True})
+        return len(keep)
+
+    def drop_before(self, symbol, timeframe, ts):
+        """
+        `ts` (ms) anından eski mumları siler (saklama süresi); kalan satırlar
+        geçici dosyalara yazılıp os.replace ile atomik olarak değiştirilir.
+        Dönüş: silinen satır sayısı.
+        """
+        n = self._row_count(symbol, timeframe)
+        if n == 0:
+            return 0
+        cols = self._memmap_columns(symbol, timeframe, n)
+        cut = int(np.searchsorted(cols['timestamp'], ts, side='left'))
+        if cut == 0:
+            return 0
+        for col in COLUMNS:
+            np.ascontiguousarray(cols[col][cut:]).tofile(self._col_path(symbol, timeframe, col) + ".tmp")
+        del cols
+        for col in COLUMNS:
+            path = self._col_path(symbol, timeframe, col)
+            os.replace(path + ".tmp", path)
+        return cut
+
+    def compact_all(self):
+        return {f"{s}:{tf}": self.compact(s, tf) for s, tf in self.list_series()}
+
+    # --- OKUMA ---
+
+    def _memmap_columns(self, symbol, timeframe, n):
+        return {col: np.memmap(self._col_path(symbol, timeframe, col), dtype=DTYPES[col],
+                               mode='r', shape=(n,))
+                for col in COLUMNS}
+
+    def read_arrays(self, symbol, timeframe, start=None, end=None):
+        """
+        Kolonları salt-okunur memmap dilimleri olarak döner (kopyasız).
+        start/end: ms cinsinden zaman damgası aralığı [start, end).
+        append() seriyi sıralı tuttuğu için okuma yolunda sıralama/compact yapılmaz.
+        """
+        n = self._row_count(symbol, timeframe)
+        if n == 0:
+            return {col: np.empty(0, dtype=DTYPES[col]) for col in COLUMNS}
+
+        cols = self._memmap_columns(symbol, timeframe, n)
+        ts = cols['timestamp']
+        lo = int(np.searchsorted(ts, start, side='left')) if start is not None else 0
+        hi = int(np.searchsorted(ts, end, side='left')) if end is not None else n
+        return {col: arr[lo:hi] for col, arr in cols.items()}
+
+    def read_dataframe(self, symbol, timeframe, start=None, end=None):
+        """
+        read_arrays çıktısını mevcut modüllerin beklediği DataFrame formatına
+        (int64 timestamp, float64 fiyatlar) çevirir. Bu adım kopyalama yapar.
+        """
+        arrays = self.read_arrays(symbol, timeframe, start, end)
+        df = pd.DataFrame({col: np.asarray(arr, dtype=np.float64) for col, arr in arrays.items()})
+        df['timestamp'] = df['timestamp'].astype(np.int64)
+        return df
+
+    # --- SQLITE'DAN AKTARIM ---
+
+    def import_from_sqlite(self, conn, timeframe='1h', chunk_size=100_000):
+        """
+        ohlcv_data tablosundaki `timeframe` zaman dilimine ait tüm sembolleri depoya aktarır.
+        """
+        imported = {}
+        symbols = [row[0] for row in conn.execute(
+            "SELECT DISTINCT symbol FROM ohlcv_data WHERE timeframe = ?", (timeframe,))]
+        for symbol in symbols:
+            cursor = conn.execute(
+                "SELECT timestamp, open, high, low, close, volume FROM ohlcv_data "
+                "WHERE symbol = ? AND timeframe = ? ORDER BY timestamp", (symbol, timeframe))
+            total = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                total += self.append(symbol, timeframe, pd.DataFrame(rows, columns=COLUMNS))
+            imported[symbol] = total
+            print(f"📦 {symbol}: {total} mum kolon deposuna aktarıldı.")
+        return imported
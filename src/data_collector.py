@@ -1,17 +1,32 @@
-import ccxt
 import pandas as pd
 from database_manager import DatabaseManager
+from metrics import MetricsRegistry
+from resampler import IncrementalResampler, resample_ohlcv, timeframe_to_ms
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
 
 class CryptoDataCollector:
-    def __init__(self, exchange_name='binance'):
+    def __init__(self, exchange_name='binance', base_timeframe=None, max_pages=200):
         # SDD [cite: 582] uyarınca borsa ismi parametrik
+        import ccxt # Ağır import: ilk collector oluşturulurken yüklenir
         self.exchange = getattr(ccxt, exchange_name)()
         self.db_manager = DatabaseManager()
+        self.metrics = MetricsRegistry()
+
+        # base_timeframe verilirse (örn. '1m') borsadan sadece bu çözünürlük
+        # çekilir; 15m/1h/4h/1d gibi üst zaman dilimleri yerelde türetilir.
+        self.base_timeframe = base_timeframe
+        self.max_pages = max_pages  # İlk doldurmada en fazla kaç sayfa (1000 mum) çekilecek
+        self._local = {}  # (symbol, timeframe) -> {'resampler', 'completed'}
 
     def fetch_ohlcv(self, symbol, timeframe='1h', limit=100):
         """Borsadan OHLCV verisini çeker[cite: 586]."""
+        if self.base_timeframe and timeframe != self.base_timeframe:
+            return self.fetch_timeframes(symbol, [timeframe], limit).get(timeframe)
+
         try:
             print(f"{symbol} verisi çekiliyor...")
+            self.metrics.exchange_calls.inc(endpoint="fetch_ohlcv")
             ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
             
             # Veriyi DataFrame'e çevir ve temizle [cite: 588]
@@ -21,13 +36,108 @@ class CryptoDataCollector:
             # SDD şemasında INTEGER tutuluyor, o yüzden raw bırakıyoruz.
             
             # Veritabanına kaydet
-            self.db_manager.insert_ohlcv(df, symbol)
+            self.db_manager.insert_ohlcv(df, symbol, timeframe)
             return df
             
         except Exception as e:
             print(f"Veri çekme hatası: {e}")
             return None
 
+    # --- YEREL ZAMAN DİLİMİ TÜRETME ---
+
+    def _fetch_base_since(self, symbol, since):
+        """Taban zaman dilimini `since` (ms) anından itibaren sayfa sayfa çeker."""
+        frames = []
+        for _ in range(self.max_pages):
+            self.metrics.exchange_calls.inc(endpoint="fetch_ohlcv")
+            batch = self.exchange.fetch_ohlcv(symbol, self.base_timeframe, since=int(since), limit=1000)
+            if not batch:
+                break
+            frames.append(pd.DataFrame(batch, columns=COLUMNS))
+            if len(batch) < 1000:
+                break
+            since = batch[-1][0] + 1
+        if not frames:
+            return pd.DataFrame(columns=COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def _seed(self, symbol, timeframe, limit, history):
+        """Kayıtlı taban geçmişten üst zaman dilimini toplu (vektörel) olarak hesaplar."""
+        resampler = IncrementalResampler(timeframe)
+        if history.empty:
+            return {'resampler': resampler, 'completed': pd.DataFrame(columns=COLUMNS)}
+
+        derived = resample_ohlcv(history, timeframe)
+        last_bucket = derived['timestamp'].iloc[-1]
+        # Son (açık) kovanın taban mumları artımlı toplayıcıya verilir
+        resampler.update(history[history['timestamp'] >= last_bucket])
+        completed = derived.iloc[:-1].tail(limit).reset_index(drop=True)
+        return {'resampler': resampler, 'completed': completed}
+
+    def fetch_timeframes(self, symbol, timeframes, limit=100):
+        """
+        Tek bir taban zaman dilimi çekimiyle istenen tüm zaman dilimlerini
+        döner: {timeframe: DataFrame}. İlk çağrıda eksik geçmiş borsadan
+        doldurulur; sonraki çağrılarda sadece yeni taban mumlar çekilir ve
+        üst mumlar artımlı güncellenir (son satır = henüz kapanmamış mum).
+        """
+        base_tf = self.base_timeframe or '1m'
+        self.base_timeframe = base_tf
+        try:
+            print(f"{symbol} {base_tf} taban verisi çekiliyor...")
+            now_ms = self.exchange.milliseconds()
+            window = max(timeframe_to_ms(tf) for tf in timeframes) * (limit + 1)
+            window_start = (now_ms - window) // timeframe_to_ms(base_tf) * timeframe_to_ms(base_tf)
+
+            states = [self._local.get((symbol, tf)) for tf in timeframes]
+            if all(states):
+                since = min(st['resampler'].last_base_timestamp for st in states)
+            else:
+                last_ts = self.db_manager.last_ohlcv_timestamp(symbol, base_tf)
+                since = last_ts if last_ts is not None and last_ts > window_start else window_start
+
+            new_base = self._fetch_base_since(symbol, since)
+            if not new_base.empty:
+                self.db_manager.insert_ohlcv(new_base, symbol, base_tf)
+
+            results = {}
+            history = None
+            for tf in timeframes:
+                key = (symbol, tf)
+                if tf == base_tf:
+                    if history is None:
+                        history = self.db_manager.load_ohlcv(symbol, base_tf, start=window_start)
+                    results[tf] = history.tail(limit).reset_index(drop=True)
+                    continue
+
+                if key not in self._local:
+                    if history is None:
+                        history = self.db_manager.load_ohlcv(symbol, base_tf, start=window_start)
+                    self._local[key] = self._seed(symbol, tf, limit, history)
+                    closed = self._local[key]['completed']
+                else:
+                    state = self._local[key]
+                    closed = pd.DataFrame(state['resampler'].update(new_base), columns=COLUMNS)
+                    if not closed.empty:
+                        state['completed'] = pd.concat(
+                            [state['completed'], closed], ignore_index=True).tail(limit).reset_index(drop=True)
+                if not closed.empty:
+                    # Kapanan üst mumlar da kendi zaman dilimiyle saklanır (eğitim/geçmiş sorguları için)
+                    self.db_manager.insert_ohlcv(closed, symbol, tf)
+
+                state = self._local[key]
+                partial = state['resampler'].partial()
+                frame = state['completed']
+                if partial is not None:
+                    frame = pd.concat([frame, pd.DataFrame([partial], columns=COLUMNS)], ignore_index=True)
+                frame['timestamp'] = frame['timestamp'].astype('int64')
+                results[tf] = frame.tail(limit).reset_index(drop=True)
+            return results
+
+        except Exception as e:
+            print(f"Veri çekme hatası: {e}")
+            return {}
+
 # Test etmek için (Main Controller'dan çağrılacak):
 if __name__ == "__main__":
     collector = CryptoDataCollector()
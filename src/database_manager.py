@@ -1,6 +1,13 @@
 import sqlite3
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from metrics import MetricsRegistry
+
+# timeframe kolonu eklenmeden önce collector sadece 1h mum yazıyordu; eski satırlar bu dilime taşınır
+LEGACY_OHLCV_TIMEFRAME = '1h'
+
+SIGNAL_EXTRA_COLUMNS = ('tech_score', 'sentiment_score', 'ml_score', 'threshold', 'price', 'predicted_price', 'horizon')
 
 class DatabaseManager:
     _instance = None
@@ -9,9 +16,26 @@ class DatabaseManager:
         if cls._instance is None:
             cls._instance = super(DatabaseManager, cls).__new__(cls)
             cls._instance.db_path = db_path
+            cls._instance.candle_store = None
             cls._instance._initialize_tables()
         return cls._instance
 
+    def enable_candle_store(self, root="data/candles", import_existing=False, timeframe='1h'):
+        """
+        Mum verisi için kolon tabanlı, memory-mapped depoyu (ColumnarCandleStore)
+        devreye alır. Bundan sonra insert_ohlcv/load_ohlcv bu depoyu kullanır.
+        import_existing=True ise ohlcv_data tablosundaki `timeframe` mumları depoya aktarılır.
+        """
+        from candle_store import ColumnarCandleStore
+        self.candle_store = ColumnarCandleStore(root)
+        if import_existing:
+            conn = self.connect()
+            try:
+                self.candle_store.import_from_sqlite(conn, timeframe=timeframe)
+            finally:
+                conn.close()
+        return self.candle_store
+
     def connect(self):
         """Veritabanı bağlantısı oluşturur[cite: 623]."""
         return sqlite3.connect(self.db_path)
@@ -20,17 +44,44 @@ class DatabaseManager:
         """SDD'de belirtilen tabloları oluşturur[cite: 668]."""
         conn = self.connect()
         cursor = conn.cursor()
+        # Yeni veritabanlarında silinen sayfalar incremental_vacuum ile geri verilebilsin
+        # (mevcut dosyalarda DatabaseMaintenance bir kereye mahsus VACUUM ile dönüştürür)
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
 
         # OHLCV Veri Tablosu [cite: 634]
+        # Aynı sembolün farklı zaman dilimleri (örn. 1m taban + 1h) yan yana tutulur
+        ohlcv_columns = {row[1] for row in cursor.execute("PRAGMA table_info(ohlcv_data)")}
+        if ohlcv_columns and 'timeframe' not in ohlcv_columns:
+            # Eski şema UNIQUE(symbol, timestamp): tablo yeni anahtarla yeniden kurulur
+            cursor.execute("ALTER TABLE ohlcv_data RENAME TO ohlcv_data_legacy")
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS ohlcv_data (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
                 timestamp INTEGER NOT NULL,
                 open REAL, high REAL, low REAL, close REAL, volume REAL,
-                UNIQUE(symbol, timestamp)
+                UNIQUE(symbol, timeframe, timestamp)
             )
         ''')
+        if ohlcv_columns and 'timeframe' not in ohlcv_columns:
+            cursor.execute('''
+                INSERT OR REPLACE INTO ohlcv_data (symbol, timeframe, timestamp, open, high, low, close, volume)
+                SELECT symbol, ?, timestamp, open, high, low, close, volume FROM ohlcv_data_legacy ORDER BY id
+            ''', (LEGACY_OHLCV_TIMEFRAME,))
+            cursor.execute("DROP TABLE ohlcv_data_legacy")
+            print(f"🔧 ohlcv_data tablosuna timeframe kolonu eklendi (eski satırlar: {LEGACY_OHLCV_TIMEFRAME}).")
+
+        # Eski mumların üst zaman dilimine toplanmış hali (DatabaseMaintenance yazar)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ohlcv_rollup (
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (symbol, timeframe, timestamp)
+            ) WITHOUT ROWID
+        ''')
 
         # Haber Veri Tablosu [cite: 641]
         cursor.execute('''
@@ -45,7 +96,7 @@ class DatabaseManager:
             )
         ''')
         
-        # Sinyal Tablosu [cite: 663]
+        # Sinyal Tablosu [cite: 663] (SignalLog toplu yazar)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS signals (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -55,26 +106,227 @@ class DatabaseManager:
                 confidence REAL
             )
         ''')
+        # Bileşen skorları sonradan eklendi; eski veritabanlarında kolonlar tamamlanır
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(signals)")}
+        for column in SIGNAL_EXTRA_COLUMNS:
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE signals ADD COLUMN {column} REAL")
+        if 'horizon' not in existing:
+            # Ufuk kolonundan önce yazılan predicted_price değerleri T+1 tahminidir
+            cursor.execute("UPDATE signals SET horizon = 1 WHERE predicted_price IS NOT NULL")
+        # Mum başına tek karar: (symbol, timestamp) tekil, insert_signals upsert yapar.
+        # Eski veritabanlarındaki tekil olmayan indeks, en son kararlar bırakılarak dönüştürülür.
+        indexes = {row[1]: row[2] for row in cursor.execute("PRAGMA index_list(signals)")}
+        if indexes.get('idx_signals_symbol_ts') == 0:
+            cursor.execute("DELETE FROM signals WHERE id NOT IN "
+                           "(SELECT MAX(id) FROM signals GROUP BY symbol, timestamp)")
+            cursor.execute("DROP INDEX idx_signals_symbol_ts")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_signals_symbol_ts ON signals (symbol, timestamp)")
+
+        # İşlem Defteri Tablosu (TradeLedger toplu yazar)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT,
+                timestamp INTEGER,
+                side TEXT,
+                price REAL, qty REAL, fee REAL, pnl REAL,
+                mode TEXT
+            )
+        ''')
 
         conn.commit()
         conn.close()
         print("Veritabanı ve tablolar hazır.")
 
-    def insert_ohlcv(self, df, symbol):
+    def insert_ohlcv(self, df, symbol, timeframe='1h'):
         """Pandas DataFrame'i veritabanına kaydeder[cite: 626]."""
+        if self.candle_store is not None:
+            rows = self.candle_store.append(symbol, timeframe, df)
+            MetricsRegistry().db_rows_written.inc(rows, table="candle_store")
+            return
+
         conn = self.connect()
         try:
-            # Timestamp ve Symbol sütunlarını ayarla
+            # Timestamp, Symbol ve Timeframe sütunlarını ayarla
             data = df.copy()
             data['symbol'] = symbol
-            # Sadece gerekli kolonları seç ve kaydet
-            data[['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume']].to_sql(
-                'ohlcv_data', conn, if_exists='append', index=False, method='multi'
-            )
+            data['timeframe'] = timeframe
+            # Çakışan (symbol, timeframe, timestamp) satırları güncellenir: her tick'te çekilen
+            # pencere öncekiyle örtüştüğü için düz INSERT tüm partiyi reddediyordu.
+            rows = data[['symbol', 'timeframe', 'timestamp', 'open', 'high', 'low', 'close', 'volume']]
+            conn.executemany('''
+                INSERT OR REPLACE INTO ohlcv_data (symbol, timeframe, timestamp, open, high, low, close, volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows.itertuples(index=False, name=None))
+            conn.commit()
+            MetricsRegistry().db_rows_written.inc(len(data), table="ohlcv_data")
             print(f"{symbol} için veriler kaydedildi.")
-        except sqlite3.IntegrityError:
-            print(f"{symbol} verileri zaten güncel.")
         except Exception as e:
             print(f"Hata: {e}")
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    def insert_trades(self, rows):
+        """
+        (symbol, timestamp, side, price, qty, fee, pnl, mode) satırlarını tek
+        transaction ile yazar. Başarılıysa True döner.
+        """
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT INTO trades (symbol, timestamp, side, price, qty, fee, pnl, mode)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+            MetricsRegistry().db_rows_written.inc(len(rows), table="trades")
+            return True
+        except Exception as e:
+            print(f"İşlem kayıt hatası: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def insert_signals(self, rows):
+        """
+        (symbol, timestamp, signal, confidence, tech_score, sentiment_score, ml_score,
+        threshold, price, predicted_price, horizon) satırlarını tek transaction ile yazar.
+        predicted_price, kararda kullanılan T+horizon tahminidir.
+        Aynı (symbol, timestamp) için kayıt varsa yenisiyle değiştirilir.
+        """
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO signals (symbol, timestamp, signal, confidence, tech_score, sentiment_score,
+                                         ml_score, threshold, price, predicted_price, horizon)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+            MetricsRegistry().db_rows_written.inc(len(rows), table="signals")
+            return True
+        except Exception as e:
+            print(f"Sinyal kayıt hatası: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def load_signals(self, symbol, start=None, end=None, limit=None):
+        """
+        Sembolün sinyal geçmişini zamana göre sıralı, hizalı numpy dizileri olarak döner:
+        timestamp (int64, ms), signal (int8: BUY=1, HOLD=0, SELL=-1) ve float64 skor/fiyat kolonları.
+        limit verilirse en yeni `limit` kayıt döner. (symbol, timestamp) indeksini kullanır.
+        """
+        from signal_log import SIGNAL_CODES
+
+        query = ("SELECT timestamp, signal, confidence, tech_score, sentiment_score, ml_score, threshold, "
+                 "price, predicted_price, horizon FROM signals WHERE symbol = ?")
+        params = [symbol]
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND timestamp < ?"
+            params.append(int(end))
+        query += " ORDER BY timestamp DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        conn = self.connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        rows.reverse()
+
+        columns = list(zip(*rows)) if rows else [()] * 10
+        as_float = lambda col: np.array([np.nan if v is None else v for v in col], dtype=np.float64)
+        return {
+            'timestamp': np.array(columns[0], dtype=np.int64),
+            'signal': np.array([SIGNAL_CODES.get(s, 0) for s in columns[1]], dtype=np.int8),
+            'score': as_float(columns[2]),
+            'tech': as_float(columns[3]),
+            'sentiment': as_float(columns[4]),
+            'ml': as_float(columns[5]),
+            'threshold': as_float(columns[6]),
+            'price': as_float(columns[7]),
+            'predicted_price': as_float(columns[8]),
+            'horizon': as_float(columns[9]),
+        }
+
+    def load_ohlcv(self, symbol, timeframe='1h', start=None, end=None):
+        """
+        Kayıtlı mum geçmişini DataFrame olarak döner (start/end: ms, [start, end)).
+        Kolon deposu açıksa oradan memmap ile, değilse SQLite'tan okunur.
+        """
+        if self.candle_store is not None:
+            return self.candle_store.read_dataframe(symbol, timeframe, start, end)
+
+        query = "SELECT timestamp, open, high, low, close, volume FROM ohlcv_data WHERE symbol = ? AND timeframe = ?"
+        params = [symbol, timeframe]
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND timestamp < ?"
+            params.append(int(end))
+        conn = self.connect()
+        try:
+            return pd.read_sql(query + " ORDER BY timestamp", conn, params=params)
+        finally:
+            conn.close()
+
+    def iter_ohlcv(self, symbol, timeframe='1h', chunk_size=100_000):
+        """
+        SQLite'taki mum geçmişini zamana göre sıralı, chunk_size satırlık
+        DataFrame parçaları halinde üretir; tüm geçmiş belleğe alınmaz.
+        """
+        conn = self.connect()
+        try:
+            cursor = conn.execute(
+                "SELECT timestamp, open, high, low, close, volume FROM ohlcv_data "
+                "WHERE symbol = ? AND timeframe = ? ORDER BY timestamp", (symbol, timeframe))
+            columns = [d[0] for d in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield pd.DataFrame(rows, columns=columns)
+        finally:
+            conn.close()
+
+    def load_ohlcv_rollup(self, symbol, timeframe='1d', start=None, end=None):
+        """Saklama süresi dolup üst zaman dilimine toplanmış eski mumları döner."""
+        query = "SELECT timestamp, open, high, low, close, volume FROM ohlcv_rollup WHERE symbol = ? AND timeframe = ?"
+        params = [symbol, timeframe]
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND timestamp < ?"
+            params.append(int(end))
+        conn = self.connect()
+        try:
+            return pd.read_sql(query + " ORDER BY timestamp", conn, params=params)
+        finally:
+            conn.close()
+
+    def last_ohlcv_timestamp(self, symbol, timeframe='1h'):
+        """Sembolün kayıtlı en son mum zaman damgasını döner (yoksa None)."""
+        if self.candle_store is not None:
+            ts = self.candle_store.read_arrays(symbol, timeframe)['timestamp']
+            return int(ts[-1]) if len(ts) else None
+
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT MAX(timestamp) FROM ohlcv_data WHERE symbol = ? AND timeframe = ?",
+                               (symbol, timeframe)).fetchone()
+            return row[0]
+        finally:
+            conn.close()
+
+    def compact_candles(self):
+        """Kolon deposundaki tüm serileri sıralayıp tekilleştirir."""
+        if self.candle_store is None:
+            return {}
+        return self.candle_store.compact_all()
@@ -0,0 +1,248 @@
+import time
+from datetime import datetime
+import pandas as pd
+from database_manager import DatabaseManager
+from metrics import MetricsRegistry
+from news_scraper import compact_news_content
+from resampler import resample_ohlcv, timeframe_to_ms
+
+DAY_MS = 86_400_000
+
+# Tablo başına saklama süresi (gün). None: süresiz saklanır.
+# ohlcv_data (ve açıksa kolon deposu) için süre dolan mumlar silinmez, rollup_timeframe'e
+# toplanıp ohlcv_rollup'a taşınır.
+DEFAULT_RETENTION = {
+    'ohlcv_data': 90,
+    'ohlcv_rollup': None,
+    'news_data': 30,
+    'signals': 180,
+    'trades': None,
+}
+
+# Tablo -> (zaman kolonu, 1 ms'deki birim sayısı). news_data saniye cinsinden tutulur.
+TIME_COLUMNS = {
+    'ohlcv_data': ('timestamp', 1.0),
+    'ohlcv_rollup': ('timestamp', 1.0),
+    'news_data': ('published_date', 1e-3),
+    'signals': ('timestamp', 1.0),
+    'trades': ('timestamp', 1.0),
+}
+
+class DatabaseMaintenance:
+    """
+    SQLite deposunun aylarca çalıştıktan sonra da küçük ve hızlı kalmasını sağlayan bakım işi.
+
+    Her çalıştırmada sırasıyla:
+    1. Saklama süresini aşan ham mumları rollup_timeframe'e toplar (resample_ohlcv)
+       ve ohlcv_rollup tablosuna taşır; ham satırlar silinir. Her dönem, o dönemi
+       kapsayan en ince zaman diliminden toplanır: türetilmiş dilimler (örn. 1m
+       tabandan üretilen 1h) sadece ince serinin kapsadığı aralıkta toplanmadan
+       silinir, ince seri başlamadan önceki kaba geçmiş kendi diliminden toplanır.
+       Aynı kural kolon deposundaki (ColumnarCandleStore) seriler için de uygulanır.
+    2. Diğer tablolarda süresi dolan satırları siler.
+    3. Uzun haber içeriklerini HTML'den arındırıp news_content_chars ile kırpar.
+    4. Boşalan sayfaları incremental_vacuum ile diske geri verir ve ANALYZE çalıştırır.
+    """
+    def __init__(self, db_manager=None, retention=None, rollup_timeframe='1d', news_content_chars=500,
+                 vacuum_pages=None):
+        self.db_manager = db_manager or DatabaseManager()
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
+        self.rollup_timeframe = rollup_timeframe
+        self.news_content_chars = news_content_chars
+        self.vacuum_pages = vacuum_pages  # None: tüm boş sayfalar
+        self.metrics = MetricsRegistry()
+        self.pruned = self.metrics.counter("db_rows_pruned_total", "Bakım işinde silinen/taşınan satır sayısı")
+
+    def _cutoff(self, table, now_ms):
+        days = self.retention.get(table)
+        if days is None:
+            return None
+        column, per_ms = TIME_COLUMNS[table]
+        return column, int((now_ms - days * DAY_MS) * per_ms)
+
+    def _rollup_cutoff(self, now_ms):
+        """Mum saklama sınırı; yarım kalan kova bir sonraki çalıştırmada bütün olarak toplansın diye yuvarlanır."""
+        cutoff = self._cutoff('ohlcv_data', now_ms)
+        if cutoff is None:
+            return None
+        step = timeframe_to_ms(self.rollup_timeframe)
+        return (cutoff[1] // step) * step
+
+    def _group_sources(self, series):
+        """
+        (symbol, timeframe, ilk damga) üçlülerinden rollup'tan ince olanları sembole
+        göre gruplar: {symbol: {timeframe: ilk damga}}.
+        """
+        step = timeframe_to_ms(self.rollup_timeframe)
+        groups = {}
+        for symbol, timeframe, first_ts in series:
+            if timeframe_to_ms(timeframe) < step:
+                groups.setdefault(symbol, {})[timeframe] = int(first_ts)
+        return groups
+
+    def _rollup_windows(self, firsts, cutoff_ts):
+        """
+        Her zaman dilimine toplanacak [lower, upper) aralığını atar (lower None: baştan).
+        En ince seri cutoff'a kadar olan kısmı üstlenir; daha kaba bir seri sadece
+        kendinden ince serilerin başlangıcından önceki dönemi toplar. İnce serinin
+        yarım kalan ilk kovası, daha kaba bir seri o kovayı kapsıyorsa ona bırakılır;
+        böylece aralıklar rollup kovalarında çakışmaz.
+        """
+        step = timeframe_to_ms(self.rollup_timeframe)
+        timeframes = sorted(firsts, key=timeframe_to_ms)
+        windows, upper = [], cutoff_ts
+        for i, timeframe in enumerate(timeframes):
+            first = firsts[timeframe]
+            if first >= upper:
+                continue  # Bu dönem zaten daha ince bir seriden toplanıyor
+            coarser = [firsts[tf] for tf in timeframes[i + 1:]]
+            if not coarser or min(coarser) >= first:
+                windows.append((timeframe, None, upper))
+                break
+            lower = min(-(-first // step) * step, upper)
+            windows.append((timeframe, lower, upper))
+            upper = lower
+        return windows
+
+    def _write_rollup(self, conn, symbol, old):
+        rollup = resample_ohlcv(old, self.rollup_timeframe)
+        rollup.insert(0, 'timeframe', self.rollup_timeframe)
+        rollup.insert(0, 'symbol', symbol)
+        conn.executemany('''
+            INSERT OR REPLACE INTO ohlcv_rollup (symbol, timeframe, timestamp, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rollup.itertuples(index=False, name=None))
+        return len(rollup)
+
+    # --- ADIMLAR ---
+
+    def downsample_candles(self, conn, now_ms):
+        """Süresi dolan ham mumları üst zaman dilimine toplayıp taşır. Dönüş: silinen ham satır sayısı."""
+        cutoff_ts = self._rollup_cutoff(now_ms)
+        if cutoff_ts is None:
+            return 0
+
+        moved = 0
+        series = conn.execute("SELECT symbol, timeframe, MIN(timestamp) FROM ohlcv_data WHERE timestamp < ? "
+                              "GROUP BY symbol, timeframe", (cutoff_ts,)).fetchall()
+        for symbol, firsts in self._group_sources(series).items():
+            windows = self._rollup_windows(firsts, cutoff_ts)
+            parts = [pd.read_sql(
+                "SELECT timestamp, open, high, low, close, volume FROM ohlcv_data "
+                "WHERE symbol = ? AND timeframe = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+                conn, params=(symbol, tf, lower if lower is not None else 0, upper))
+                for tf, lower, upper in windows]
+            old = pd.concat(parts, ignore_index=True).sort_values('timestamp') if parts else pd.DataFrame()
+            placeholders = ",".join("?" * len(firsts))
+            with conn:
+                n_rollup = self._write_rollup(conn, symbol, old) if not old.empty else 0
+                deleted = conn.execute(
+                    f"DELETE FROM ohlcv_data WHERE symbol = ? AND timeframe IN ({placeholders}) AND timestamp < ?",
+                    (symbol, *firsts, cutoff_ts)).rowcount
+            moved += deleted
+            sources = ", ".join(tf for tf, _, _ in windows)
+            print(f"🗜️ {symbol}: {deleted} eski mum ({sources} serilerinden) {n_rollup} adet "
+                  f"{self.rollup_timeframe} muma toplandı.")
+        self.pruned.inc(moved, table="ohlcv_data")
+        return moved
+
+    def downsample_candle_store(self, conn, now_ms):
+        """Kolon deposundaki süresi dolan mumları ohlcv_rollup'a toplayıp depodan siler."""
+        store = self.db_manager.candle_store
+        cutoff_ts = self._rollup_cutoff(now_ms)
+        if store is None or cutoff_ts is None:
+            return 0
+
+        moved = 0
+        series = []
+        for symbol, timeframe in store.list_series():
+            ts = store.read_arrays(symbol, timeframe, end=cutoff_ts)['timestamp']
+            if len(ts):
+                series.append((symbol, timeframe, ts[0]))
+        for symbol, firsts in self._group_sources(series).items():
+            parts = [store.read_dataframe(symbol, tf, start=lower, end=upper)
+                     for tf, lower, upper in self._rollup_windows(firsts, cutoff_ts)]
+            old = pd.concat(parts, ignore_index=True).sort_values('timestamp') if parts else pd.DataFrame()
+            if not old.empty:
+                with conn:
+                    self._write_rollup(conn, symbol, old)
+            deleted = sum(store.drop_before(symbol, tf, cutoff_ts) for tf in firsts)
+            if deleted:
+                print(f"🗜️ {symbol}: kolon deposundan {deleted} eski mum {self.rollup_timeframe} rollup'a taşındı.")
+            moved += deleted
+        self.pruned.inc(moved, table="candle_store")
+        return moved
+
+    def prune_tables(self, conn, now_ms):
+        """ohlcv_data dışındaki tablolarda süresi dolan satırları siler."""
+        deleted = {}
+        for table in TIME_COLUMNS:
+            if table == 'ohlcv_data':
+                continue
+            cutoff = self._cutoff(table, now_ms)
+            if cutoff is None:
+                continue
+            column, value = cutoff
+            with conn:
+                n = conn.execute(f"DELETE FROM {table} WHERE {column} < ?", (value,)).rowcount
+            if n:
+                self.pruned.inc(n, table=table)
+            deleted[table] = n
+        return deleted
+
+    def compact_news(self, conn):
+        """Uzun haber içeriklerini kırpar. Dönüş: güncellenen satır sayısı."""
+        if not self.news_content_chars:
+            return 0
+        rows = conn.execute("SELECT id, content FROM news_data WHERE length(content) > ?",
+                            (self.news_content_chars,)).fetchall()
+        with conn:
+            conn.executemany("UPDATE news_data SET content = ? WHERE id = ?",
+                             [(compact_news_content(content, self.news_content_chars), row_id)
+                              for row_id, content in rows])
+        return len(rows)
+
+    def vacuum(self, conn):
+        """Boş sayfaları geri verir ve sorgu planlayıcı istatistiklerini günceller."""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Eski veritabanı: incremental moda geçiş için bir kereye mahsus tam VACUUM gerekir
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        freed = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # executescript: pragma sonuna kadar adımlanır (execute ile her seferde tek sayfa boşalır)
+        pages = f"({int(self.vacuum_pages)})" if self.vacuum_pages else ""
+        conn.executescript(f"PRAGMA incremental_vacuum{pages};")
+        conn.execute("ANALYZE")
+        return freed
+
+    def run(self):
+        """Tüm bakım adımlarını çalıştırır ve bir özet döner."""
+        now_ms = int(time.time() * 1000)
+        conn = self.db_manager.connect()
+        try:
+            with self.metrics.stage("db_maintenance"):
+                report = {
+                    'candles_downsampled': self.downsample_candles(conn, now_ms),
+                    'candle_store_downsampled': self.downsample_candle_store(conn, now_ms),
+                    'deleted': self.prune_tables(conn, now_ms),
+                    'news_compacted': self.compact_news(conn),
+                    'pages_freed': self.vacuum(conn),
+                }
+        finally:
+            conn.close()
+        print(f"🧹 [DB-BAKIM] {datetime.now()}: {report}")
+        return report
+
+    def start(self, interval_hours=24):
+        import schedule
+
+        print(f"🕒 Veritabanı bakım işi başlatıldı. ({interval_hours} saatte bir çalışacak)")
+        self.run()
+        schedule.every(interval_hours).hours.do(self.run)
+
+        while True:
+            schedule.run_pending()
+            time.sleep(60)
+
+if __name__ == "__main__":
+    DatabaseMaintenance().start(interval_hours=24)
@@ -1,74 +1,117 @@
-import pandas as pd
+from functools import cached_property
 import numpy as np
 from data_collector import CryptoDataCollector
 from news_scraper import NewsScraper
 from technical_analysis import TechnicalAnalysis
 from sentiment_analysis import SentimentAnalysis
-from ml_models import LSTMModel, MLManager
+from ml_models import MLManager, FEATURE_COLS, FEATURE_SET_VERSION, LEGACY_MODEL_PATH, LEGACY_SCALER_PATH
+from model_registry import ModelRegistry
 from signal_generator import HybridSignalGenerator
+from signal_log import SignalLog
 from database_manager import DatabaseManager
+from metrics import MetricsRegistry
 
 class MainController:
     """
     Tüm sistemi koordine eden ana sınıf.
     """
-    def __init__(self):
+    def __init__(self, metrics_port=None, timeframe='1h', max_models=8, base_timeframe=None):
+        self.timeframe = timeframe
+        # Verilirse (örn. '1m') borsadan sadece bu dilim çekilir, self.timeframe yerelde türetilir
+        self.base_timeframe = base_timeframe
+        self.metrics = MetricsRegistry()
+        if metrics_port:
+            try:
+                self.metrics.start_http_server(port=metrics_port)
+            except OSError as e:
+                print(f"⚠️ Metrik sunucusu başlatılamadı: {e}")
         self.db = DatabaseManager()
-        self.collector = CryptoDataCollector()
-        self.news_scraper = NewsScraper()
-        self.sentiment_analyzer = SentimentAnalysis()
-        self.signal_generator = HybridSignalGenerator()
+        # Her karar bileşen skorlarıyla tamponlanır ve signals tablosuna toplu yazılır
+        self.signal_log = SignalLog(db_manager=self.db)
+        self.signal_generator = HybridSignalGenerator(signal_log=self.signal_log)
         self.ml_manager = MLManager()
+        # Sembol başına model/scaler; sık kullanılanlar bellekte (LRU) kalır
+        self.model_registry = ModelRegistry(max_models=max_models)
+
+    # Ağır bileşenler (ccxt borsa nesnesi, VADER sözlüğü, HTTP istemcisi)
+    # ilk kullanımda oluşturulur; böylece app.py açılışı beklemez.
+    @cached_property
+    def collector(self):
+        return CryptoDataCollector(base_timeframe=self.base_timeframe)
+
+    @cached_property
+    def news_scraper(self):
+        return NewsScraper()
+
+    @cached_property
+    def sentiment_analyzer(self):
+        return SentimentAnalysis()
         
     def run_analysis(self, symbol='BTC/USDT'):
+        with self.metrics.profile_cycle(label=symbol), self.metrics.stage("run_analysis"):
+            return self._run_analysis(symbol)
+
+    def _run_analysis(self, symbol):
         results = {}
         
         # 1. Veri Toplama
         print("1. Veriler toplanıyor...")
-        df = self.collector.fetch_ohlcv(symbol)
-        news_list = self.news_scraper.fetch_news()
+        with self.metrics.stage("fetch_ohlcv"):
+            df = self.collector.fetch_ohlcv(symbol, self.timeframe)
+        with self.metrics.stage("fetch_news"):
+            news_list = self.news_scraper.fetch_news()
         
         if df is None or df.empty:
             return {"error": "Borsa verisi alınamadı."}
             
         # 2. Teknik Analiz
         print("2. Teknik analiz yapılıyor...")
-        ta = TechnicalAnalysis(df)
-        df_analyzed = ta.get_all_indicators()
+        with self.metrics.stage("technical_analysis"):
+            ta = TechnicalAnalysis(df)
+            df_analyzed = ta.get_all_indicators()
         results['dataframe'] = df_analyzed
         
         # 3. Duygu Analizi
         print("3. Duygu analizi yapılıyor...")
         news_texts = [n['title'] for n in news_list]
-        sentiment_score = self.sentiment_analyzer.aggregate_scores(news_texts)
+        with self.metrics.stage("sentiment"):
+            sentiment_score = self.sentiment_analyzer.aggregate_scores(news_texts)
         results['sentiment_score'] = sentiment_score
         
         # 4. ML Tahmini (LSTM)
         print("4. Fiyat tahmini yapılıyor...")
         
         # DÜZELTME: is_training=False ile çağırıyoruz. Sadece T+1 (gelecek) için son 60 mumu alır ve kayıtlı scaler'ı kullanır.
-        X_latest, _, scaler = self.ml_manager.prepare_data(df_analyzed, is_training=False)
+        with self.metrics.stage("model_load"):
+            entry = self.model_registry.get(
+                symbol, self.timeframe, FEATURE_SET_VERSION, input_shape=(60, len(FEATURE_COLS)),
+                legacy_paths=(LEGACY_MODEL_PATH, LEGACY_SCALER_PATH))
+
+        with self.metrics.stage("prepare_data"):
+            X_latest, _, scaler = self.ml_manager.prepare_data(df_analyzed, is_training=False, scaler=entry.scaler)
         
         if X_latest is not None and len(X_latest) > 0:
-            lstm = LSTMModel(input_shape=(X_latest.shape[1], X_latest.shape[2]))
-            
-            # X_latest zaten modelin istediği formatta (1, 60, 2)
-            predicted_scaled = lstm.predict(X_latest)
-            predicted_price = scaler.inverse_transform([[predicted_scaled[0][0], 0]])[0][0]
-            results['predicted_price'] = float(predicted_price)
+            # X_latest zaten modelin istediği formatta (1, 60, 2); tek ileri geçiş
+            # T+1 ... T+K yolunu (1, K) verir, ters ölçekleme tüm ufukta vektörel yapılır
+            with self.metrics.stage("lstm_inference"):
+                predicted_scaled = entry.model.predict(X_latest)
+            predicted_path = self.ml_manager.inverse_close(scaler, predicted_scaled[0])
         else:
-            results['predicted_price'] = df_analyzed['close'].iloc[-1]
+            predicted_path = np.array([df_analyzed['close'].iloc[-1]], dtype=np.float64)
+        results['predicted_path'] = predicted_path
+        results['predicted_price'] = float(predicted_path[0])  # T+1 (geriye dönük uyumluluk)
             
         # 5. Sinyal Üretimi
         print("5. Sinyal üretiliyor...")
         current_price = df_analyzed['close'].iloc[-1]
         
-        signal, confidence = self.signal_generator.generate_signal(
-            current_price, 
-            results['predicted_price'], 
-            sentiment_score, 
-            df_analyzed
-        )
+        with self.metrics.stage("generate_signal"):
+            signal, confidence = self.signal_generator.generate_signal(
+                current_price, 
+                results['predicted_path'], 
+                sentiment_score, 
+                df_analyzed
+            )
         
         results['signal'] = signal
         results['confidence'] = confidence
@@ -0,0 +1,256 @@
+import io
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + list(extra or [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Counter:
+    """Sadece artan sayaç (etiket kombinasyonu başına ayrı değer tutar)."""
+    def __init__(self, name, help_text=""):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, val in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {val}")
+        return lines
+
+
+class Histogram:
+    """
+    Son `window` gözlemi tutan kayan (rolling) histogram.
+    Yüzdelikler pencere üzerinden, _sum/_count ise tüm ömür boyunca hesaplanır.
+    """
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, name, help_text="", window=1024):
+        self.name = name
+        self.help_text = help_text
+        self.window = window
+        self._samples = {}
+        self._sum = {}
+        self._count = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.window)
+                self._sum[key] = 0.0
+                self._count[key] = 0
+            self._samples[key].append(value)
+            self._sum[key] += value
+            self._count[key] += 1
+
+    def quantiles(self, **labels):
+        samples = self._samples.get(_label_key(labels))
+        if not samples:
+            return {}
+        arr = np.fromiter(samples, dtype=np.float64)
+        return {q: float(np.quantile(arr, q)) for q in self.QUANTILES}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} summary"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._samples.items()}
+            sums, counts = dict(self._sum), dict(self._count)
+        for key, samples in sorted(snapshot.items()):
+            arr = np.array(samples, dtype=np.float64)
+            for q in self.QUANTILES:
+                lines.append(f"{self.name}{_format_labels(key, [('quantile', q)])} {np.quantile(arr, q):.6f}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {sums[key]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {counts[key]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Süreç içi (in-process) metrik kayıt defteri. Tek örnek (Singleton) olarak
+    çalışır; böylece DataCollector, DatabaseManager, ml_models gibi modüller
+    aynı sayaçlara yazabilir.
+    """
+    _instance = None
+
+    def __new__(cls, prefix="crypto"):
+        if cls._instance is None:
+            cls._instance = super(MetricsRegistry, cls).__new__(cls)
+            cls._instance._setup(prefix)
+        return cls._instance
+
+    def _setup(self, prefix):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+        # Runtime'da açılıp kapatılabilen döngü başı profil yakalama
+        self.profiling_enabled = False
+        self.tracemalloc_enabled = False
+        self.last_profile = None
+
+        self.stage_wall = self.histogram("stage_wall_seconds", "Aşama başına duvar saati süresi")
+        self.stage_cpu = self.histogram("stage_cpu_seconds", "Aşama başına CPU süresi (thread)")
+        self.exchange_calls = self.counter("exchange_calls_total", "Borsa API çağrı sayısı")
+        self.cache_hits = self.counter("cache_hits_total", "Önbellek isabet sayısı")
+        self.cache_misses = self.counter("cache_misses_total", "Önbellek ıskalama sayısı")
+        self.db_rows_written = self.counter("db_rows_written_total", "Veritabanına yazılan satır sayısı")
+        self.model_reloads = self.counter("model_reloads_total", "Diskten model yükleme sayısı")
+
+    def _register(self, cls, name, help_text, **kwargs):
+        full_name = f"{self.prefix}_{name}"
+        with self._lock:
+            if full_name not in self._metrics:
+                self._metrics[full_name] = cls(full_name, help_text, **kwargs)
+            return self._metrics[full_name]
+
+    def counter(self, name, help_text=""):
+        return self._register(Counter, name, help_text)
+
+    def histogram(self, name, help_text="", window=1024):
+        return self._register(Histogram, name, help_text, window=window)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Bir aşamanın duvar saati ve CPU süresini ölçüp histogramlara yazar.
+        Kullanım: with metrics.stage("fetch_ohlcv"): ...
+        """
+        wall0 = time.perf_counter()
+        cpu0 = time.thread_time()
+        try:
+            yield
+        finally:
+            self.stage_wall.observe(time.perf_counter() - wall0, stage=name)
+            self.stage_cpu.observe(time.thread_time() - cpu0, stage=name)
+
+    # --- PROFİL YAKALAMA ---
+
+    def set_profiling(self, cprofile=None, memory=None):
+        """cProfile ve/veya tracemalloc yakalamayı çalışma anında açıp kapatır."""
+        if cprofile is not None:
+            self.profiling_enabled = bool(cprofile)
+        if memory is not None:
+            self.tracemalloc_enabled = bool(memory)
+
+    @contextmanager
+    def profile_cycle(self, label="cycle", top=25):
+        """
+        Profil açıksa bir analiz döngüsünü cProfile/tracemalloc ile yakalar ve
+        metin özetini self.last_profile içine koyar. Kapalıysa maliyeti yoktur.
+        """
+        profiler = cProfile.Profile() if self.profiling_enabled else None
+        trace_mem = self.tracemalloc_enabled and not tracemalloc.is_tracing()
+        if trace_mem:
+            tracemalloc.start()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+            if profiler or trace_mem:
+                report = {'label': label, 'captured_at': time.time()}
+                if profiler:
+                    buf = io.StringIO()
+                    pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(top)
+                    report['cprofile'] = buf.getvalue()
+                if trace_mem:
+                    snapshot = tracemalloc.take_snapshot()
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    stats = snapshot.statistics("lineno")[:top]
+                    report['peak_mem_bytes'] = peak
+                    report['tracemalloc'] = "\n".join(str(s) for s in stats)
+                self.last_profile = report
+
+    # --- DIŞA AKTARIM ---
+
+    def render_prometheus(self):
+        """Tüm metrikleri Prometheus metin formatında döner."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port=9108, host="127.0.0.1"):
+        """
+        /metrics (Prometheus), /profile (son yakalama) ve /profile/on|off
+        uç noktalarını sunan yerel HTTP sunucusunu arka planda başlatır.
+        """
+        if self._server is not None:
+            return self._server
+
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = registry.render_prometheus()
+                elif self.path == "/profile/on":
+                    registry.set_profiling(cprofile=True, memory=True)
+                    body = "profiling on\n"
+                elif self.path == "/profile/off":
+                    registry.set_profiling(cprofile=False, memory=False)
+                    body = "profiling off\n"
+                elif self.path == "/profile":
+                    p = registry.last_profile
+                    body = "no profile captured\n" if not p else (
+                        p.get('cprofile', '') + "\n" + p.get('tracemalloc', '') + "\n")
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # Her scrape'i konsola basma
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        print(f"📈 Metrik sunucusu başlatıldı: http://{host}:{port}/metrics")
+        return self._server
+
+    def stop_http_server(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -1,12 +1,21 @@
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error
-from sklearn.preprocessing import MinMaxScaler
-import tensorflow as tf
 import os
-import joblib # YENİ: Scaler'ı kaydedip yüklemek için eklendi
+# NOT: tensorflow, sklearn ve joblib ağır kütüphaneler; modül yüklenirken değil,
+# ilk kullanıldıkları metot içinde import ediliyor (hızlı açılış için).
+from metrics import MetricsRegistry
+from model_registry import ModelVersionStore
+
+# Manifest yokken (henüz sürümlü model yayınlanmadıysa) kullanılan eski yollar
+LEGACY_MODEL_PATH = "data/lstm_model.keras"
+LEGACY_SCALER_PATH = "data/scaler.save"
+
+# Modelin beklediği girdi kolonları. Liste (veya HORIZON) değişirse eski modeller
+# uyumsuz olacağı için FEATURE_SET_VERSION da artırılmalı (registry anahtarının parçası).
+FEATURE_COLS = ['close', 'volume']
+# Model tek ileri geçişte T+1 ... T+HORIZON kapanışlarını birlikte tahmin eder
+HORIZON = 12
+FEATURE_SET_VERSION = "fs2"  # fs1: tek adım (T+1) çıktı, fs2: HORIZON adımlı çıktı
 
 class BaseMLModel:
     """
@@ -19,11 +28,13 @@ class BaseMLModel:
         raise NotImplementedError
         
     def evaluate(self, X, y):
+        from sklearn.metrics import mean_absolute_error
         predictions = self.predict(X)
         return mean_absolute_error(y, predictions)
 
 class LinearRegressionModel(BaseMLModel):
     def __init__(self):
+        from sklearn.linear_model import LinearRegression
         self.model = LinearRegression()
         
     def train(self, X, y):
@@ -34,6 +45,7 @@ class LinearRegressionModel(BaseMLModel):
 
 class RandomForestModel(BaseMLModel):
     def __init__(self):
+        from sklearn.ensemble import RandomForestRegressor
         self.model = RandomForestRegressor(n_estimators=100, random_state=42)
         
     def train(self, X, y):
@@ -42,17 +54,47 @@ class RandomForestModel(BaseMLModel):
     def predict(self, X):
         return self.model.predict(X)
 
+def _time_budget_callback(max_seconds):
+    """Süre bütçesi dolunca model.fit'i durduran Keras callback'i üretir."""
+    import time
+    import tensorflow as tf
+
+    class TimeBudget(tf.keras.callbacks.Callback):
+        def on_train_begin(self, logs=None):
+            self.deadline = time.monotonic() + max_seconds
+
+        def on_train_batch_end(self, batch, logs=None):
+            if time.monotonic() >= self.deadline:
+                self.model.stop_training = True
+
+    return TimeBudget()
+
 class LSTMModel(BaseMLModel):
     """
     Zaman serisi tahmini için LSTM (Derin Öğrenme).
+    Çıktı katmanı `horizon` birimlidir: tek predict çağrısı (B, horizon) boyutlu
+    T+1 ... T+horizon yolunu döner (özyinelemeli tahmin gerekmez).
+    horizon=None ise yüklenen modelin kendi ufku kullanılır (eski tek adımlı
+    modeller de canlıda çalışmaya devam eder); verilirse ve uyuşmazsa model
+    sıfırdan kurulur.
     """
-    def __init__(self, input_shape):
-        self.model_path = "data/lstm_model.keras" 
+    def __init__(self, input_shape, model_path=None, horizon=None):
+        # Yol verilmezse yayındaki (manifest) sürüm, o da yoksa eski sabit dosya kullanılır
+        self.model_path = model_path or ModelVersionStore().current_paths()[0] or LEGACY_MODEL_PATH
         self.input_shape = input_shape
+        self.horizon = horizon
         
         if os.path.exists(self.model_path):
+            import tensorflow as tf
             try:
                 self.model = tf.keras.models.load_model(self.model_path)
+                MetricsRegistry().model_reloads.inc(kind="lstm")
+                loaded_horizon = self.model.output_shape[-1]
+                if horizon and loaded_horizon != horizon:
+                    print(f"ℹ️ Kayıtlı model {loaded_horizon} adımlı, {horizon} adımlı model kuruluyor.")
+                    self._build_model()
+                else:
+                    self.horizon = loaded_horizon
             except Exception as e:
                 print(f"Model yükleme hatası, yeniden oluşturuluyor: {e}")
                 self._build_model()
@@ -61,6 +103,8 @@ class LSTMModel(BaseMLModel):
 
     def _build_model(self):
         """Model mimarisini oluşturur"""
+        import tensorflow as tf
+        self.horizon = self.horizon or HORIZON
         self.model = tf.keras.models.Sequential()
         self.model.add(tf.keras.layers.Input(shape=self.input_shape))
         self.model.add(tf.keras.layers.LSTM(50, return_sequences=True))
@@ -74,16 +118,40 @@ class LSTMModel(BaseMLModel):
         self.model.add(tf.keras.layers.Dropout(0.2))
         
         self.model.add(tf.keras.layers.Dense(25))
-        self.model.add(tf.keras.layers.Dense(1))
+        self.model.add(tf.keras.layers.Dense(self.horizon))  # T+1 ... T+horizon
         self.model.compile(optimizer='adam', loss='mean_squared_error')
         
-    def train(self, X, y, epochs=5, batch_size=32):
-        self.model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=0)
+    def train(self, X, y, epochs=5, batch_size=32, max_seconds=None):
+        # max_seconds: eğitim süresi bütçesi; aşılınca batch sonunda durdurulur
+        callbacks = [_time_budget_callback(max_seconds)] if max_seconds else None
+        self.model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=0, callbacks=callbacks)
         try:
             self.model.save(self.model_path)
         except Exception as e:
             print(f"Model kayıt hatası: {e}")
         
+    def train_stream(self, stream, epochs=5, max_seconds=None):
+        """
+        training_pipeline.WindowStream'den akan float32 batch'lerle eğitir;
+        tüm pencere dizisi bellekte oluşturulmaz.
+        """
+        callbacks = [_time_budget_callback(max_seconds)] if max_seconds else None
+        self.model.fit(stream.as_tf_dataset(shuffle=True), epochs=epochs, verbose=0, callbacks=callbacks)
+        try:
+            self.model.save(self.model_path)
+        except Exception as e:
+            print(f"Model kayıt hatası: {e}")
+
+    def predict_stream(self, stream):
+        """Akıştaki tüm pencereler için (N, horizon) tahmin ve gerçek yolları sırayla döner."""
+        preds, targets = [], []
+        for X, y in stream.batches(shuffle=False):
+            preds.append(np.asarray(self.model.predict_on_batch(X)).reshape(len(X), -1))
+            targets.append(y)
+        if not preds:
+            return np.empty((0, self.horizon)), np.empty((0, stream.horizon))
+        return np.concatenate(preds), np.concatenate(targets)
+
     def predict(self, X):
         return self.model.predict(X)
 
@@ -91,28 +159,88 @@ class MLManager:
     """
     Veriyi hazırlayıp modelleri yöneten yardımcı sınıf.
     """
-    def __init__(self):
-        self.scaler_path = "data/scaler.save"
+    def __init__(self, scaler_path=None):
+        # None ise eğitimde eski sabit yola yazılır, canlıda yayındaki sürüm okunur
+        self.scaler_path = scaler_path
+        self.version_store = ModelVersionStore()
+        self._scaler_cache = (None, None)  # (path, scaler)
 
-    def prepare_data(self, df, feature_cols=['close', 'volume'], target_col='close', lookback=60, is_training=True):
+    def _load_scaler(self):
         """
-        is_training=True ise modeli eğitmek için X,y üretir ve scaler kaydeder.
-        is_training=False ise canlı trade için sadece son 60 mumu verir ve kayıtlı scaler'ı yükler.
+        Canlı sistem için scaler'ı yükler. Aynı dosya için diskten tekrar
+        okumaz; yeni sürüm yayınlandığında yol değiştiği için otomatik yenilenir.
+        """
+        import joblib
+        path = self.scaler_path or self.version_store.current_paths()[1] or LEGACY_SCALER_PATH
+        cached_path, cached_scaler = self._scaler_cache
+        if cached_path == path:
+            MetricsRegistry().cache_hits.inc(cache="scaler")
+            return cached_scaler
+        if not os.path.exists(path):
+            return None
+        MetricsRegistry().cache_misses.inc(cache="scaler")
+        scaler = joblib.load(path)
+        MetricsRegistry().model_reloads.inc(kind="scaler")
+        self._scaler_cache = (path, scaler)
+        return scaler
+
+    @staticmethod
+    def make_windows(scaled_data, lookback=60, horizon=1):
+        """
+        (N, F) ölçeklenmiş veriden (M, lookback, F) pencereleri ve (M, horizon)
+        hedef yollarını (sonraki `horizon` mumun 0. kolonu) tek seferde üretir.
+        M = N - lookback - horizon + 1; yolu tamamlanmayan son pencereler atlanır.
+        """
+        n = len(scaled_data) - lookback - horizon + 1
+        windows = np.lib.stride_tricks.sliding_window_view(scaled_data, lookback, axis=0)
+        X = np.ascontiguousarray(windows[:n].transpose(0, 2, 1), dtype=np.float32)
+        targets = np.lib.stride_tricks.sliding_window_view(scaled_data[lookback:, 0], horizon)
+        y = np.ascontiguousarray(targets[:n], dtype=np.float32)
+        return X, y
+
+    def transform_windows(self, df, scaler, feature_cols=FEATURE_COLS, lookback=60, horizon=1):
+        """Verilen (sabit) scaler ile X, y üretir; scaler'ı yeniden fit etmez."""
+        if len(df) < lookback + horizon:
+            return np.array([]), np.array([])
+        return self.make_windows(scaler.transform(df[feature_cols].values), lookback, horizon)
+
+    @staticmethod
+    def inverse_close(scaler, values, close_index=0):
+        """
+        Ölçekli kapanış tahminlerini vektörel olarak fiyata geri çevirir.
+        values herhangi bir şekilde olabilir (örn. (B, horizon) yollar); şekil korunur.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        padded = np.zeros((values.size, scaler.n_features_in_))
+        padded[:, close_index] = values.reshape(-1)
+        return scaler.inverse_transform(padded)[:, close_index].reshape(values.shape)
+
+    def prepare_data(self, df, feature_cols=FEATURE_COLS, target_col='close', lookback=60, is_training=True, scaler=None,
+                     horizon=HORIZON):
+        """
+        is_training=True ise modeli eğitmek için X, (M, horizon) y üretir ve scaler kaydeder.
+        is_training=False ise canlı trade için sadece son 60 mumu verir ve kayıtlı scaler'ı yükler
+        (scaler parametresi verilirse, örn. ModelRegistry'den, o kullanılır).
         """
         if len(df) < lookback:
             return np.array([]), np.array([]), None
 
+        import joblib # Scaler'ı kaydedip yüklemek için
+        from sklearn.preprocessing import MinMaxScaler
+
         data = df[feature_cols].values
         
         # 2. DÜZELTME (TRAINING-SERVING SKEW): Scaler kaydetme ve yükleme
         if is_training:
             scaler = MinMaxScaler(feature_range=(0, 1))
             scaled_data = scaler.fit_transform(data)
-            os.makedirs("data", exist_ok=True)
-            joblib.dump(scaler, self.scaler_path) # Eğitilen scaler'ı kaydet
+            scaler_path = self.scaler_path or LEGACY_SCALER_PATH
+            os.makedirs(os.path.dirname(scaler_path) or ".", exist_ok=True)
+            joblib.dump(scaler, scaler_path) # Eğitilen scaler'ı kaydet
         else:
-            if os.path.exists(self.scaler_path):
-                scaler = joblib.load(self.scaler_path) # Canlıda aynı scaler'ı yükle
+            if scaler is None:
+                scaler = self._load_scaler() # Canlıda aynı scaler'ı yükle
+            if scaler is not None:
                 scaled_data = scaler.transform(data)   # fit_transform DEĞİL, transform yap!
             else:
                 print("⚠️ Scaler dosyası bulunamadı, fallback yapılıyor.")
@@ -121,13 +249,12 @@ class MLManager:
         
         # 1. DÜZELTME (LOOKAHEAD BIAS): X ve y'yi doğru ayırma
         if is_training:
-            X, y = [], []
-            for i in range(lookback, len(scaled_data)):
-                X.append(scaled_data[i-lookback:i])
-                y.append(scaled_data[i, 0]) 
-            return np.array(X), np.array(y), scaler
+            if len(scaled_data) < lookback + horizon:
+                return np.array([]), np.array([]), scaler
+            X, y = self.make_windows(scaled_data, lookback, horizon)
+            return X, y, scaler
         else:
-            # Canlı sistem (Inference): Bize sadece GELECEĞİ (T+1) tahmin etmek için
+            # Canlı sistem (Inference): Bize sadece GELECEĞİ (T+1 ... T+horizon) tahmin etmek için
             # EN SON lookback kadar veri (örneğin son 60 mum) lazım.
             X_latest = scaled_data[-lookback:]
             return np.array([X_latest]), None, scaler
\ No newline at end of file
@@ -0,0 +1,226 @@
+import os
+import json
+import shutil
+import tempfile
+from collections import OrderedDict
+from datetime import datetime
+from metrics import MetricsRegistry
+
+
+class ModelVersionStore:
+    """
+    Eğitilen LSTM modeli ve scaler'ı sürümlü olarak saklar.
+
+    <root>/tmp/<rastgele>/   : eğitim sırasında yazılan aday (candidate) dosyalar
+    <root>/v<N>/             : yayına alınmış (promoted) sürüm, bir daha değişmez
+    <root>/manifest.json     : canlı sistemin okuduğu güncel sürüm bilgisi
+
+    Yayına alma os.replace ile atomik yapılır; okuyucu yarım yazılmış bir
+    dosyayı asla göremez, ya eski ya yeni sürümü görür.
+    """
+    MODEL_FILE = "model.keras"
+    SCALER_FILE = "scaler.save"
+
+    def __init__(self, root="data/models"):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self._manifest_cache = None
+        self._manifest_mtime = None
+
+    def read_manifest(self):
+        """
+        manifest.json içeriğini döner (yoksa None). Dosya değişmediyse
+        (mtime aynı) diskten tekrar okunmaz; her tick'te çağrılabilir.
+        """
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime != self._manifest_mtime:
+            with open(self.manifest_path) as f:
+                self._manifest_cache = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest_cache
+
+    def current_version(self):
+        manifest = self.read_manifest()
+        return manifest['version'] if manifest else None
+
+    def current_paths(self):
+        """Yayındaki (model_path, scaler_path) çiftini döner, yoksa (None, None)."""
+        manifest = self.read_manifest()
+        if not manifest:
+            return None, None
+        return manifest['model_path'], manifest['scaler_path']
+
+    def new_candidate_dir(self):
+        """Eğitim çıktıları için geçici aday dizini oluşturur."""
+        tmp_root = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_root, exist_ok=True)
+        return tempfile.mkdtemp(prefix="candidate_", dir=tmp_root)
+
+    def discard(self, candidate_dir):
+        shutil.rmtree(candidate_dir, ignore_errors=True)
+
+    def promote(self, candidate_dir, metrics=None):
+        """
+        Aday dizini yeni sürüm olarak yayına alır ve manifest'i atomik olarak günceller.
+        Dönüş: yeni sürüm numarası.
+        """
+        manifest = self.read_manifest() or {}
+        version = manifest.get('version', 0) + 1
+        while os.path.exists(os.path.join(self.root, f"v{version}")):
+            version += 1
+
+        version_dir = os.path.join(self.root, f"v{version}")
+        os.replace(candidate_dir, version_dir)
+
+        new_manifest = {
+            'version': version,
+            'model_path': os.path.join(version_dir, self.MODEL_FILE),
+            'scaler_path': os.path.join(version_dir, self.SCALER_FILE),
+            'promoted_at': datetime.now().isoformat(timespec='seconds'),
+            'metrics': metrics or {},
+            'previous_version': manifest.get('version'),
+        }
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(new_manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+        self.prune()
+        return version
+
+    def prune(self, keep=3):
+        """En yeni `keep` sürüm dışındaki eski sürüm dizinlerini siler."""
+        current = self.current_version()
+        versions = sorted(int(d[1:]) for d in os.listdir(self.root)
+                          if d.startswith("v") and d[1:].isdigit())
+        for v in versions[:-keep]:
+            if v != current:
+                shutil.rmtree(os.path.join(self.root, f"v{v}"), ignore_errors=True)
+
+
+class _CachedModel:
+    """get() çıktısı: önbellekteki model ile sembolün scaler'ından oluşan çift."""
+    def __init__(self, model, scaler, model_path, scaler_path, size_bytes):
+        self.model = model
+        self.scaler = scaler
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.size_bytes = size_bytes
+
+
+class ModelRegistry:
+    """
+    (symbol, timeframe, feature_version) anahtarlı model/scaler kayıt defteri.
+
+    Disk yapısı: <root>/<BTC_USDT>/<1h>/<fs1>/ altında her anahtarın kendi
+    ModelVersionStore'u bulunur. Bir sembolün kendi modeli yoksa sırasıyla
+    genel (global) sürüm ve eski sabit dosyalar kullanılır.
+
+    Bellekte modeller ve scaler'lar ayrı LRU önbelleklerde, kendi dosya
+    yollarına göre tutulur: ortak modeli kullanan semboller tek bir TF grafiğini
+    paylaşır, her sembolün scaler'ı ayrıca önbellekte kalır. Böylece semboller
+    sırayla sorgulandığında ortak model diskten tekrar yüklenmez.
+    max_models / max_bytes aşıldığında en uzun süredir kullanılmayan model,
+    max_scalers aşıldığında en uzun süredir kullanılmayan scaler atılır.
+    """
+    def __init__(self, root="data/models", max_models=8, max_bytes=None, max_scalers=64):
+        self.root = root
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.max_scalers = max_scalers
+        self.global_store = ModelVersionStore(root)
+        self._stores = {}
+        self._cache = OrderedDict()    # model_path -> (model, size_bytes)
+        self._scalers = OrderedDict()  # scaler_path -> scaler
+        self._cached_bytes = 0
+        self.metrics = MetricsRegistry()
+
+    def store(self, symbol, timeframe, feature_version):
+        """Anahtara özel (yoksa oluşturulacak) sürüm deposunu döner."""
+        key = (symbol, timeframe, feature_version)
+        if key not in self._stores:
+            path = os.path.join(self.root, symbol.replace('/', '_'), timeframe, feature_version)
+            self._stores[key] = ModelVersionStore(path)
+        return self._stores[key]
+
+    def resolve_paths(self, symbol, timeframe, feature_version, legacy_paths=(None, None)):
+        """
+        Bu anahtar için canlıda kullanılacak (model_path, scaler_path):
+        sembole özel sürüm -> genel sürüm -> eski sabit dosyalar.
+        Scaler dosyası olmayan sürüm atlanır; aksi halde canlı veriye yeni bir
+        scaler fit edilir ve model eğitimdekinden farklı ölçekte beslenirdi.
+        """
+        for store in (self.store(symbol, timeframe, feature_version), self.global_store):
+            model_path, scaler_path = store.current_paths()
+            if model_path:
+                # Çok sembollü ortak modelde her sembolün kendi scaler'ı vardır
+                symbol_scaler = os.path.join(os.path.dirname(model_path), "scalers",
+                                             symbol.replace('/', '_') + ".save")
+                if os.path.exists(symbol_scaler):
+                    scaler_path = symbol_scaler
+                if not (scaler_path and os.path.exists(scaler_path)):
+                    continue
+                return model_path, scaler_path
+        return legacy_paths
+
+    def get(self, symbol, timeframe, feature_version, input_shape, legacy_paths=(None, None)):
+        """
+        Anahtarın modelini ve scaler'ını döner (_CachedModel). Önbellekteyse
+        diske dokunulmaz; yeni sürüm yayınlandıysa yol değiştiği için yeniden yüklenir.
+        """
+        model_path, scaler_path = self.resolve_paths(symbol, timeframe, feature_version, legacy_paths)
+        model, size = self._get_model(model_path, input_shape)
+        scaler = self._get_scaler(scaler_path)
+        return _CachedModel(model, scaler, model_path, scaler_path, size)
+
+    def _get_model(self, model_path, input_shape):
+        cached = self._cache.get(model_path)
+        if cached is not None:
+            self._cache.move_to_end(model_path)
+            self.metrics.cache_hits.inc(cache="model_registry")
+            return cached
+
+        self.metrics.cache_misses.inc(cache="model_registry")
+        from ml_models import LSTMModel
+
+        model = LSTMModel(input_shape=input_shape, model_path=model_path)
+        size = os.path.getsize(model_path) if model_path and os.path.exists(model_path) else 0
+        self._insert(model_path, (model, size))
+        return model, size
+
+    def _get_scaler(self, scaler_path):
+        if not (scaler_path and os.path.exists(scaler_path)):
+            return None
+        if scaler_path in self._scalers:
+            self._scalers.move_to_end(scaler_path)
+            self.metrics.cache_hits.inc(cache="scaler_registry")
+            return self._scalers[scaler_path]
+
+        self.metrics.cache_misses.inc(cache="scaler_registry")
+        import joblib
+
+        scaler = joblib.load(scaler_path)
+        self.metrics.model_reloads.inc(kind="scaler")
+        self._scalers[scaler_path] = scaler
+        while self.max_scalers and len(self._scalers) > self.max_scalers:
+            self._scalers.popitem(last=False)
+        return scaler
+
+    def _insert(self, model_path, entry):
+        old = self._cache.pop(model_path, None)
+        if old is not None:
+            self._cached_bytes -= old[1]
+        self._cache[model_path] = entry
+        self._cached_bytes += entry[1]
+
+        while len(self._cache) > 1 and (
+                (self.max_models and len(self._cache) > self.max_models) or
+                (self.max_bytes and self._cached_bytes > self.max_bytes)):
+            _, (_, evicted_size) = self._cache.popitem(last=False)
+            self._cached_bytes -= evicted_size
+            self.metrics.counter("model_evictions_total", "LRU'dan atılan model sayısı").inc()
+
+    def cached_keys(self):
+        return list(self._cache.keys())
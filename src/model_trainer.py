@@ -1,19 +1,40 @@
+import os
 import pandas as pd
 import numpy as np
-import ccxt
-import pandas_ta as ta  # Teknik analiz için (pip install pandas_ta gerekebilir)
-from ml_models import LSTMModel, MLManager
+from ml_models import (LSTMModel, MLManager, FEATURE_COLS, FEATURE_SET_VERSION, HORIZON, LEGACY_MODEL_PATH,
+                       LEGACY_SCALER_PATH)
+from model_registry import ModelRegistry
+from training_pipeline import WindowStream, fit_scaler_chunked, fit_scaler_stream, scale_series, scale_stream
 from database_manager import DatabaseManager
+from metrics import MetricsRegistry
 import time
 
+
+def _path_mae(pred, true, steps=None):
+    """
+    Fiyat cinsinden (N, K) tahmin ve gerçek yollar arasındaki MAE (ilk `steps` adım).
+    Ufukları farklı modeller (örn. eski tek adımlı model) ortak ilk adımlar üzerinden kıyaslanır.
+    """
+    k = min(pred.shape[1], true.shape[1], steps or true.shape[1])
+    return float(np.mean(np.abs(pred[:, :k] - true[:, :k])))
+
 class ModelTrainer:
     def __init__(self, symbol='BTC/USDT', timeframe='1h', limit=1000):
         self.symbol = symbol
         self.timeframe = timeframe
         self.limit = limit # Ne kadar geçmiş veri çekilecek? (1000 mum ~ 40 gün)
-        self.exchange = ccxt.binance()
+        self._exchange = None
         self.db = DatabaseManager()
         self.ml_manager = MLManager()
+        self.registry = ModelRegistry()
+
+    @property
+    def exchange(self):
+        # ccxt ilk veri çekiminde yüklenir (AutoLearner açılışını hızlandırır)
+        if self._exchange is None:
+            import ccxt
+            self._exchange = ccxt.binance()
+        return self._exchange
 
     def fetch_historical_data(self):
         """
@@ -22,6 +43,7 @@ class ModelTrainer:
         """
         print(f"📥 {self.symbol} için {self.limit} adet geçmiş veri çekiliyor...")
         try:
+            MetricsRegistry().exchange_calls.inc(endpoint="fetch_ohlcv")
             ohlcv = self.exchange.fetch_ohlcv(self.symbol, self.timeframe, limit=self.limit)
             df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
             return df
@@ -33,6 +55,8 @@ class ModelTrainer:
         """
         Veriyi zenginleştirir (Feature Engineering).
         """
+        import pandas_ta as ta  # Teknik analiz için (pip install pandas_ta gerekebilir)
+
         # Pandas-TA kütüphanesi veya manuel hesaplama ile indikatör ekle
         # Bizim TechnicalAnalysis sınıfımız da kullanılabilir ama eğitim için hızlı hesap lazım
         
@@ -66,24 +90,292 @@ class ModelTrainer:
         
         print(f"🧠 Eğitim başlıyor... Veri boyutu: {len(df)}")
         
-        # 3. Veriyi Hazırla (X, y split)
-        # lookback=60 (Son 60 saatlik veriye bakıp gelecek saati tahmin et)
-        X, y, scaler = self.ml_manager.prepare_data(df, lookback=60)
-        
-        if len(X) == 0:
-            print("Yetersiz veri!")
+        # 3-4. Veriyi hazırla (lookback=60) ve ağır eğitim (50 Epoch).
+        # İlk eğitimde kıyaslanacak model olmadığı için doğrulama beklenmeden yayına alınır.
+        print("🏋️‍♂️ Model ağırlık kaldırıyor (50 Epoch)... Bu işlem biraz sürebilir.")
+        result = self.train_candidate(df, epochs=50, batch_size=32, force=True)
+        if not result['promoted']:
+            print(f"Eğitim başarısız: {result.get('reason')}")
             return
 
-        # 4. Modeli Başlat ve Eğit (Ağır Eğitim)
-        # 50 Epoch: Modelin veriyi iyice öğrenmesini sağlar
-        lstm = LSTMModel(input_shape=(X.shape[1], X.shape[2]))
-        
-        print("🏋️‍♂️ Model ağırlık kaldırıyor (50 Epoch)... Bu işlem biraz sürebilir.")
-        lstm.train(X, y, epochs=50, batch_size=32)
-        
-        print("✅ Model başarıyla eğitildi ve 'data/lstm_model.keras' konumuna kaydedildi.")
+        print(f"✅ {self.symbol} modeli başarıyla eğitildi ve v{result['version']} olarak yayına alındı.")
         print("🤖 Artık botu (app.py) başlattığında bu 'akıllı' modeli kullanacak!")
 
+    def train_candidate(self, df, epochs=5, batch_size=32, lookback=60,
+                        holdout_ratio=0.1, tolerance=0.05, force=False, shuffle_buffer=8192, horizon=HORIZON):
+        """
+        Modeli geçici aday dizinine eğitir, son `holdout_ratio` kadar pencere
+        üzerinde (fiyat cinsinden MAE) yayındaki modelle kıyaslar ve aday en
+        fazla `tolerance` oranında kötüyse atomik olarak yayına alır.
+        Canlı sistemin okuduğu dosyalara eğitim sırasında hiç dokunulmaz.
+        Pencereler WindowStream ile float32 batch'ler halinde akıtılır; hedef
+        T+1 ... T+horizon yoludur ve MAE tüm ufuk üzerinden hesaplanır.
+        """
+        import joblib
+
+        # Her sembol/zaman dilimi kendi dizinine yayınlanır; diğer sembollerin modeli ezilmez
+        store = self.registry.store(self.symbol, self.timeframe, FEATURE_SET_VERSION)
+        n_windows = len(df) - lookback - horizon + 1
+        split = int(n_windows * (1 - holdout_ratio))
+        # Eğitim hedef yolları holdout mumlarına taşmasın diye horizon-1 pencere boşluk bırakılır
+        train_end = lookback + split - (horizon - 1)
+        if n_windows < 2 or split == n_windows or train_end <= lookback:
+            return {'promoted': False, 'version': None, 'reason': "Yetersiz veri"}
+
+        candidate_dir = store.new_candidate_dir()
+        try:
+            scaler = fit_scaler_chunked(df, FEATURE_COLS)
+            joblib.dump(scaler, os.path.join(candidate_dir, store.SCALER_FILE))
+            series = scale_series(df, scaler, FEATURE_COLS)
+            holdout_range = (lookback + split, lookback + n_windows)
+            train_stream = WindowStream([series], lookback, batch_size, shuffle_buffer,
+                                        ranges=[(lookback, train_end)], horizon=horizon)
+            holdout_stream = WindowStream([series], lookback, batch_size * 8,
+                                          ranges=[holdout_range], horizon=horizon)
+
+            input_shape = (lookback, len(FEATURE_COLS))
+            # Sembolün kendi modeli yoksa genel/eski modelden başlanır ve onunla kıyaslanır
+            current_model_path, current_scaler_path = self.registry.resolve_paths(
+                self.symbol, self.timeframe, FEATURE_SET_VERSION,
+                legacy_paths=(LEGACY_MODEL_PATH, LEGACY_SCALER_PATH))
+            if current_model_path and not os.path.exists(current_model_path):
+                current_model_path, current_scaler_path = None, None
+
+            # Yayındaki ağırlıklardan devam et (önceki davranışla aynı), ama adaya kaydet
+            # Ufku farklı (eski) bir modelden başlanamaz; o durumda model sıfırdan kurulur
+            lstm = LSTMModel(input_shape=input_shape, model_path=current_model_path, horizon=horizon)
+            lstm.model_path = os.path.join(candidate_dir, store.MODEL_FILE)
+            lstm.train_stream(train_stream, epochs=epochs)
+
+            candidate_pred, y_holdout = lstm.predict_stream(holdout_stream)
+            y_true = MLManager.inverse_close(scaler, y_holdout)
+            candidate_prices = MLManager.inverse_close(scaler, candidate_pred)
+            candidate_mae = _path_mae(candidate_prices, y_true)
+
+            current_mae = None
+            if not force and current_model_path and os.path.exists(current_scaler_path or ""):
+                current = LSTMModel(input_shape=input_shape, model_path=current_model_path)
+                current_scaler = joblib.load(current_scaler_path)
+                current_series = scale_series(df, current_scaler, FEATURE_COLS)
+                current_pred, _ = current.predict_stream(WindowStream(
+                    [current_series], lookback, batch_size * 8, ranges=[holdout_range], horizon=horizon))
+                # Yayındaki model daha kısa ufuklu olabilir; kıyas ortak adımlar üzerinden yapılır
+                common = min(current.horizon, horizon)
+                current_mae = _path_mae(MLManager.inverse_close(current_scaler, current_pred), y_true, common)
+                candidate_mae = _path_mae(candidate_prices, y_true, common)
+
+            metrics = {'symbol': self.symbol, 'candidate_mae': candidate_mae, 'current_mae': current_mae,
+                       'train_windows': train_end - lookback, 'holdout_windows': n_windows - split,
+                       'horizon': horizon,
+                       # Eğitimde kullanılan son hedef mum; holdout mumlarını artımlı eğitim öğrenir
+                       'last_trained_ts': int(df['timestamp'].iloc[train_end + horizon - 2]), 'mode': 'full'}
+            print(f"📏 Holdout MAE -> aday: {candidate_mae:.4f} | yayındaki: {current_mae}")
+
+            if force or current_mae is None or candidate_mae <= current_mae * (1 + tolerance):
+                version = store.promote(candidate_dir, metrics)
+                return {'promoted': True, 'version': version, **metrics}
+
+            store.discard(candidate_dir)
+            return {'promoted': False, 'version': None, 'reason': "Aday modelden daha kötü", **metrics}
+        except Exception:
+            store.discard(candidate_dir)
+            raise
+
+    def train_multi_symbol(self, symbols, epochs=5, batch_size=256, lookback=60,
+                           holdout_ratio=0.1, shuffle_buffer=8192, max_seconds=None, horizon=HORIZON):
+        """
+        Birden çok sembolün kayıtlı mum geçmişiyle (DatabaseManager.load_ohlcv /
+        kolon deposu) tek bir ortak model eğitir. Her sembol kendi scaler'ı ile
+        ölçeklenir ve diskte float32 memmap olarak tutulur; SQLite geçmişi de
+        parça parça okunduğu için RAM kullanımı geçmiş uzunluğundan bağımsızdır.
+        Ortak model genel (global) sürüm olarak yayınlanır, sembol scaler'ları
+        sürüm dizinindeki scalers/ altına yazılır ve registry bunları otomatik
+        kullanır. Ortak bir scaler yazılmaz: kendi scaler'ı olmayan semboller
+        bu modelle servis edilmez (ModelRegistry.resolve_paths).
+        """
+        import joblib
+
+        store = self.registry.global_store
+        candidate_dir = store.new_candidate_dir()
+        try:
+            os.makedirs(os.path.join(candidate_dir, "scalers"), exist_ok=True)
+            used_symbols, series_list, train_ranges, holdout_ranges, scalers = [], [], [], [], []
+            for symbol in symbols:
+                out_path = os.path.join(candidate_dir, symbol.replace('/', '_') + ".npy")
+                if self.db.candle_store is not None:
+                    columns = self.db.candle_store.read_arrays(symbol, self.timeframe)
+                    n_rows = len(columns['close'])
+                else:
+                    # SQLite: iki geçiş (fit + ölçekleme), her seferinde parça parça okunur
+                    chunks = lambda: self.db.iter_ohlcv(symbol, self.timeframe)
+                    scaler, n_rows = fit_scaler_stream(chunks(), FEATURE_COLS)
+                n_windows = n_rows - lookback - horizon + 1
+                split = lookback + int(n_windows * (1 - holdout_ratio))
+                # Eğitim hedef yolları holdout'a taşmasın diye horizon-1 pencere boşluk bırakılır;
+                # kısa seride boşluktan sonra eğitim penceresi kalmıyorsa sembol atlanır
+                train_end = split - (horizon - 1)
+                if n_windows < horizon + 1 or train_end <= lookback:
+                    print(f"⚠️ {symbol} için yetersiz geçmiş, atlanıyor.")
+                    continue
+
+                if self.db.candle_store is not None:
+                    scaler = fit_scaler_chunked(columns, FEATURE_COLS)
+                    series = scale_series(columns, scaler, FEATURE_COLS, out_path=out_path)
+                else:
+                    series = scale_stream(chunks(), scaler, FEATURE_COLS, n_rows, out_path)
+                joblib.dump(scaler, os.path.join(candidate_dir, "scalers", symbol.replace('/', '_') + ".save"))
+                used_symbols.append(symbol)
+                series_list.append(series)
+                scalers.append(scaler)
+                train_ranges.append((lookback, train_end))
+                holdout_ranges.append((split, lookback + n_windows))
+
+            if not series_list:
+                store.discard(candidate_dir)
+                return {'promoted': False, 'version': None, 'reason': "Yetersiz veri"}
+
+            input_shape = (lookback, len(FEATURE_COLS))
+            lstm = LSTMModel(input_shape=input_shape, horizon=horizon)
+            lstm.model_path = os.path.join(candidate_dir, store.MODEL_FILE)
+            train_stream = WindowStream(series_list, lookback, batch_size, shuffle_buffer, ranges=train_ranges,
+                                        horizon=horizon)
+            print(f"🏋️‍♂️ {len(series_list)} sembol, {train_stream.num_windows} pencere ile ortak eğitim...")
+            lstm.train_stream(train_stream, epochs=epochs, max_seconds=max_seconds)
+
+            maes = {}
+            for i, symbol in enumerate(used_symbols):
+                pred, y = lstm.predict_stream(WindowStream([series_list[i]], lookback, batch_size * 8,
+                                                           ranges=[holdout_ranges[i]], horizon=horizon))
+                maes[symbol] = _path_mae(MLManager.inverse_close(scalers[i], pred),
+                                         MLManager.inverse_close(scalers[i], y))
+
+            # Ölçeklenmiş geçici seriler yayına alınmaz
+            del series_list, train_stream
+            for name in os.listdir(candidate_dir):
+                if name.endswith(".npy"):
+                    os.remove(os.path.join(candidate_dir, name))
+
+            version = store.promote(candidate_dir, {'symbols': list(maes), 'holdout_mae': maes, 'mode': 'multi',
+                                                   'horizon': horizon})
+            return {'promoted': True, 'version': version, 'holdout_mae': maes}
+        except Exception:
+            store.discard(candidate_dir)
+            raise
+
+    def fine_tune_incremental(self, df, epochs=2, batch_size=32, lookback=60, replay_ratio=1.0,
+                              min_replay=64, validation_windows=256, tolerance=0.05,
+                              max_seconds=30, scaler_update='frozen', max_range_expansion=0.10,
+                              seed=None, horizon=HORIZON):
+        """
+        Yayındaki modeli sadece son eğitimden sonra kapanan mumlarla biten
+        pencereler + eski pencerelerden rastgele bir tekrar (replay) örneği
+        üzerinde ince ayar yapar. Scaler yeniden fit edilmez:
+          - scaler_update='frozen': aynen kullanılır (varsayılan)
+          - scaler_update='expand' : yeni veri aralığı en fazla max_range_expansion
+            oranında aşıyorsa min/max genişletilir (partial_fit), fazlası reddedilir.
+        Eğitim max_seconds ile sınırlıdır. Yeni pencerelerin en yenileri
+        (en fazla validation_windows) eğitime katılmaz; aday bu pencerelerde
+        yayındaki modelle kıyaslanır ve bir sonraki turda onları öğrenir.
+        Modelin veya son eğitim bilgisinin olmadığı ya da yayındaki modelin ufku
+        `horizon`dan farklı olduğu durumda tam eğitime düşer.
+        """
+        import copy
+        import shutil
+        import joblib
+
+        store = self.registry.store(self.symbol, self.timeframe, FEATURE_SET_VERSION)
+        manifest = store.read_manifest()
+        last_trained_ts = (manifest or {}).get('metrics', {}).get('last_trained_ts')
+        if not manifest or last_trained_ts is None:
+            print("ℹ️ Artımlı eğitim için yayında model yok, tam eğitim yapılıyor.")
+            return self.train_candidate(df, epochs=max(epochs, 5), batch_size=batch_size, lookback=lookback,
+                                        horizon=horizon)
+
+        current_model_path, current_scaler_path = store.current_paths()
+        scaler = joblib.load(current_scaler_path)
+
+        # Son satır henüz kapanmamış mum olabilir; kapanınca bir sonraki turda öğrenilir
+        df = df.iloc[:-1]
+        X, y = MLManager().transform_windows(df, scaler, lookback=lookback, horizon=horizon)
+        if len(X) == 0:
+            return {'promoted': False, 'version': None, 'reason': "Yetersiz veri"}
+        # Her pencere, hedef yolunun son mumu kapandığında "yeni" sayılır
+        target_ts = df['timestamp'].to_numpy()[lookback + horizon - 1:]
+
+        new_idx = np.flatnonzero(target_ts > last_trained_ts)
+        if len(new_idx) == 0:
+            return {'promoted': False, 'version': None, 'reason': "Yeni mum yok"}
+
+        candidate_scaler = scaler
+        if scaler_update == 'expand':
+            candidate_scaler = copy.deepcopy(scaler)
+            candidate_scaler.partial_fit(df[FEATURE_COLS].values)
+            old_range = scaler.data_max_ - scaler.data_min_
+            growth = (candidate_scaler.data_max_ - candidate_scaler.data_min_) / np.where(old_range == 0, 1, old_range) - 1
+            if np.any(growth > max_range_expansion):
+                print(f"⚠️ Veri aralığı %{growth.max() * 100:.1f} genişledi; scaler dondurulmuş kalıyor (tam eğitim önerilir).")
+                candidate_scaler = scaler
+            elif np.any(growth > 0):
+                X, y = MLManager().transform_windows(df, candidate_scaler, lookback=lookback, horizon=horizon)
+
+        # En yeni pencereler doğrulamaya ayrılır; hedef yolları doğrulamaya taşan
+        # (horizon-1) pencere de eğitime alınmaz
+        n_val = min(validation_windows, len(new_idx) // 2)
+        val_idx = new_idx[len(new_idx) - n_val:]
+        fit_idx = new_idx[:max(0, len(new_idx) - n_val - (horizon - 1))]
+        if n_val == 0 or len(fit_idx) == 0:
+            return {'promoted': False, 'version': None, 'reason': "Doğrulama için yeterli yeni pencere yok"}
+
+        rng = np.random.default_rng(seed)
+        pool_idx = np.arange(new_idx[0])
+        rng.shuffle(pool_idx)
+        n_replay = min(len(pool_idx), max(min_replay, int(len(fit_idx) * replay_ratio)))
+        train_idx = np.concatenate([fit_idx, pool_idx[:n_replay]])
+        rng.shuffle(train_idx)
+
+        candidate_dir = store.new_candidate_dir()
+        try:
+            input_shape = (X.shape[1], X.shape[2])
+            lstm = LSTMModel(input_shape=input_shape, model_path=current_model_path)
+            if lstm.horizon != horizon:
+                print(f"ℹ️ Yayındaki model {lstm.horizon} adımlı; {horizon} adım için tam eğitim yapılıyor.")
+                store.discard(candidate_dir)
+                return self.train_candidate(df, epochs=max(epochs, 5), batch_size=batch_size, lookback=lookback,
+                                            horizon=horizon)
+            lstm.model_path = os.path.join(candidate_dir, store.MODEL_FILE)
+            if candidate_scaler is scaler:
+                shutil.copyfile(current_scaler_path, os.path.join(candidate_dir, store.SCALER_FILE))
+            else:
+                joblib.dump(candidate_scaler, os.path.join(candidate_dir, store.SCALER_FILE))
+
+            print(f"🔁 Artımlı eğitim: {len(fit_idx)} yeni + {n_replay} tekrar penceresi (en fazla {max_seconds}s)")
+            lstm.train(X[train_idx], y[train_idx], epochs=epochs, batch_size=batch_size, max_seconds=max_seconds)
+
+            current = LSTMModel(input_shape=input_shape, model_path=current_model_path)
+            X_cur, y_cur = MLManager().transform_windows(df, scaler, lookback=lookback, horizon=horizon)
+            y_true = MLManager.inverse_close(scaler, y_cur[val_idx])
+            candidate_pred = MLManager.inverse_close(candidate_scaler, lstm.predict(X[val_idx]))
+            current_pred = MLManager.inverse_close(scaler, current.predict(X_cur[val_idx]))
+            candidate_mae = _path_mae(candidate_pred, y_true)
+            current_mae = _path_mae(current_pred, y_true)
+            print(f"📏 Yeni pencere doğrulaması MAE -> aday: {candidate_mae:.4f} | yayındaki: {current_mae:.4f}")
+
+            metrics = {'symbol': self.symbol, 'candidate_mae': candidate_mae, 'current_mae': current_mae,
+                       'new_windows': int(len(fit_idx)), 'replay_windows': int(n_replay),
+                       'validation_windows': int(n_val), 'last_trained_ts': int(target_ts[fit_idx[-1]]),
+                       'scaler_updated': candidate_scaler is not scaler, 'mode': 'incremental',
+                       'horizon': horizon}
+
+            if candidate_mae <= current_mae * (1 + tolerance):
+                version = store.promote(candidate_dir, metrics)
+                return {'promoted': True, 'version': version, **metrics}
+
+            store.discard(candidate_dir)
+            return {'promoted': False, 'version': None, 'reason': "Aday modelden daha kötü", **metrics}
+        except Exception:
+            store.discard(candidate_dir)
+            raise
+
 if __name__ == "__main__":
     # Gerekli kütüphane uyarısı
     try:
@@ -1,8 +1,20 @@
-import requests
-from bs4 import BeautifulSoup
+import re
+import html
 from database_manager import DatabaseManager
 from datetime import datetime
 
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def compact_news_content(content, max_chars=500):
+    """Haber içeriğindeki HTML'i temizler ve max_chars karaktere kırpar (kayıt ve DB bakımı için)."""
+    if not content:
+        return content
+    text = _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", content))).strip()
+    return text[:max_chars] if max_chars else text
+
+
 class NewsScraper:
     """
     SRS Bölüm 4.1.1 uyarınca Haber Toplama Modülü.
@@ -22,6 +34,9 @@ class NewsScraper:
         """
         FR-02: Tanımlı kaynaklardan güncel haberleri çeker.
         """
+        import requests
+        from bs4 import BeautifulSoup
+
         all_news = []
         
         for source in self.sources:
@@ -49,6 +64,7 @@ class NewsScraper:
     def _save_to_db(self, news_item):
         """
         FR-04: Haberi veritabanına kaydeder.
+        İçerik HTML'den arındırılıp kırpılarak yazılır (tam HTML saklanmaz).
         """
         conn = self.db_manager.connect()
         cursor = conn.cursor()
@@ -56,7 +72,8 @@ class NewsScraper:
             cursor.execute('''
                 INSERT OR IGNORE INTO news_data (title, content, source, published_date, sentiment_score)
                 VALUES (?, ?, ?, ?, 0)
-            ''', (news_item['title'], news_item['content'], news_item['source'], news_item['published_date']))
+            ''', (news_item['title'], compact_news_content(news_item['content']), news_item['source'],
+                  news_item['published_date']))
             conn.commit()
         except Exception as e:
             print(f"DB Kayıt Hatası: {e}")
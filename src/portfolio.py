@@ -0,0 +1,151 @@
+import numpy as np
+
+
+class Portfolio:
+    """
+    Sembol anahtarlı, çoklu pozisyon tutan portföy motoru.
+
+    - Her sembol sabit bir indekse sahiptir; pozisyon durumu (miktar, giriş
+      fiyatı, açılış zamanı) sembol başına tek satırlık numpy dizilerinde tutulur.
+    - mark_to_market() toplam varlığı fiyat vektöründen tek bir nokta çarpımıyla hesaplar.
+    - allocate() aynı anda gelen AL sinyalleri arasında sermayeyi kurallara göre dağıtır.
+    """
+    def __init__(self, cash=0.0, capacity=16, max_positions=5, max_weight=None, rule='confidence',
+                 min_order=10.0, fee_buffer=0.01):
+        self.cash = float(cash)
+        self.symbols = []
+        self._symbol_ids = {}
+        self.qty = np.zeros(capacity, dtype=np.float64)
+        self.entry_price = np.zeros(capacity, dtype=np.float64)
+        self.opened_at = np.zeros(capacity, dtype=np.int64)
+
+        # Sermaye dağıtım kuralları
+        self.max_positions = max_positions  # Aynı anda açık olabilecek en fazla pozisyon
+        # Tek pozisyonun toplam varlık içindeki azami payı; varsayılan pozisyon hakkı başına eşit pay
+        self.max_weight = max_weight if max_weight is not None else 1.0 / max_positions
+        self.rule = rule                    # 'equal' veya 'confidence'
+        self.min_order = min_order          # Binance min işlem limiti genellikle 10$
+        self.fee_buffer = fee_buffer        # Komisyon payı (bakiyenin %99'u kullanılır)
+
+    def symbol_id(self, symbol):
+        if symbol not in self._symbol_ids:
+            if len(self.symbols) == len(self.qty):
+                for name in ('qty', 'entry_price', 'opened_at'):
+                    old = getattr(self, name)
+                    grown = np.zeros(len(old) * 2, dtype=old.dtype)
+                    grown[:len(old)] = old
+                    setattr(self, name, grown)
+            self._symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return self._symbol_ids[symbol]
+
+    # --- POZİSYONLAR ---
+
+    def in_position(self, symbol):
+        i = self._symbol_ids.get(symbol)
+        return i is not None and self.qty[i] > 0
+
+    def position(self, symbol):
+        """(miktar, giriş fiyatı) döner; pozisyon yoksa (0, 0)."""
+        i = self._symbol_ids.get(symbol)
+        if i is None:
+            return 0.0, 0.0
+        return float(self.qty[i]), float(self.entry_price[i])
+
+    def open_symbols(self):
+        n = len(self.symbols)
+        return [self.symbols[i] for i in np.flatnonzero(self.qty[:n] > 0)]
+
+    @property
+    def num_open(self):
+        return int(np.count_nonzero(self.qty[:len(self.symbols)] > 0))
+
+    def open(self, symbol, qty, price, timestamp, fee=0.0, pay=True):
+        """
+        Pozisyon açar veya mevcut pozisyona ekler (giriş fiyatı ağırlıklı ortalama).
+        pay=False: nakit borsada tutuluyorsa (REAL) sadece pozisyon kaydedilir.
+        """
+        i = self.symbol_id(symbol)
+        total = self.qty[i] + qty
+        if self.qty[i] == 0:
+            self.opened_at[i] = timestamp
+        self.entry_price[i] = (self.qty[i] * self.entry_price[i] + qty * price) / total
+        self.qty[i] = total
+        if pay:
+            self.cash -= qty * price + fee
+
+    def close(self, symbol, price, qty=None, fee=0.0, pay=True):
+        """
+        Pozisyonu (qty verilmezse tamamen) kapatır; (satılan miktar, gerçekleşen P/L) döner.
+        """
+        i = self._symbol_ids.get(symbol)
+        if i is None or self.qty[i] == 0:
+            return 0.0, 0.0
+        sold = float(self.qty[i]) if qty is None else min(float(qty), float(self.qty[i]))
+        pnl = (price - self.entry_price[i]) * sold - fee
+        self.qty[i] -= sold
+        if self.qty[i] <= 1e-12:
+            self.qty[i] = 0.0
+            self.entry_price[i] = 0.0
+        if pay:
+            self.cash += sold * price - fee
+        return sold, float(pnl)
+
+    # --- DEĞERLEME ---
+
+    def price_vector(self, prices):
+        """{sembol: fiyat} sözlüğünü sembol indekslerine hizalı diziye çevirir (eksikse giriş fiyatı)."""
+        n = len(self.symbols)
+        vec = self.entry_price[:n].copy()
+        for symbol, price in prices.items():
+            i = self._symbol_ids.get(symbol)
+            if i is not None:
+                vec[i] = price
+        return vec
+
+    def mark_to_market(self, prices, cash=None):
+        """
+        Toplam varlık ve sembol başına gerçekleşmemiş P/L.
+        prices: {sembol: fiyat} sözlüğü veya self.symbols sırasına hizalı dizi.
+        cash: REAL modda borsadan gelen nakit bakiye (verilmezse kendi nakdi).
+        """
+        n = len(self.symbols)
+        vec = self.price_vector(prices) if isinstance(prices, dict) else np.asarray(prices, dtype=np.float64)[:n]
+        qty = self.qty[:n]
+        equity = (self.cash if cash is None else cash) + float(qty @ vec)
+        unrealized = qty * (vec - self.entry_price[:n])
+        return equity, unrealized
+
+    # --- SERMAYE DAĞITIMI ---
+
+    def allocate(self, candidates, prices, cash=None, pending=None):
+        """
+        Aynı anda gelen AL sinyalleri için sembol başına harcanacak USDT miktarı.
+
+        candidates: {sembol: güven skoru}. Zaten pozisyonda olanlar atlanır; boş
+        pozisyon hakkı kadar en yüksek skorlu semboller seçilir. Kullanılabilir nakit
+        'equal' kuralında eşit, 'confidence' kuralında skorla orantılı bölünür ve her
+        pozisyon max_weight * toplam varlık ile sınırlanır. min_order altı elenir.
+        pending: {sembol: ayrılan USDT}; dolmamış ALIM emirleri (REAL). Bunlar hem bir
+        pozisyon hakkı hem de nakitten ayrılmış tutar olarak sayılır.
+        """
+        cash = self.cash if cash is None else cash
+        pending = {s: a for s, a in (pending or {}).items() if not self.in_position(s)}
+        slots = self.max_positions - self.num_open - len(pending)
+        picks = [(s, c) for s, c in candidates.items() if not self.in_position(s) and s not in pending]
+        if slots <= 0 or not picks:
+            return {}
+        picks = sorted(picks, key=lambda sc: abs(sc[1]), reverse=True)[:slots]
+
+        budget = max(0.0, cash - sum(pending.values())) * (1 - self.fee_buffer)
+        if self.rule == 'equal':
+            weights = np.ones(len(picks))
+        else:
+            weights = np.array([abs(c) for _, c in picks], dtype=np.float64)
+            if weights.sum() <= 0:
+                weights = np.ones(len(picks))
+        amounts = budget * weights / weights.sum()
+
+        equity, _ = self.mark_to_market(prices, cash=cash)
+        amounts = np.minimum(amounts, self.max_weight * equity)
+        return {s: float(a) for (s, _), a in zip(picks, amounts) if a >= self.min_order}
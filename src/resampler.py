@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+_UNIT_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+def timeframe_to_ms(timeframe):
+    """'15m', '4h', '1d' gibi ccxt zaman dilimlerini milisaniyeye çevirir."""
+    try:
+        return int(timeframe[:-1]) * _UNIT_MS[timeframe[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Desteklenmeyen zaman dilimi: {timeframe}")
+
+
+def resample_arrays(arrays, target_timeframe):
+    """
+    Taban zaman dilimindeki (örn. 1m) sıralı OHLCV dizilerini üst zaman
+    dilimine (örn. 4h) vektörel olarak toplar. Girdi np.memmap olabilir.
+    Dönen mumların timestamp'i kova (bucket) başlangıcıdır; son kova
+    henüz kapanmamış olabilir.
+    """
+    ts = np.asarray(arrays['timestamp'])
+    if len(ts) == 0:
+        return {col: np.empty(0) for col in COLUMNS}
+
+    step = timeframe_to_ms(target_timeframe)
+    bucket = (ts // step) * step
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    ends = np.concatenate((starts[1:], [len(ts)])) - 1
+
+    return {
+        'timestamp': bucket[starts],
+        'open': np.asarray(arrays['open'])[starts],
+        'high': np.maximum.reduceat(np.asarray(arrays['high']), starts),
+        'low': np.minimum.reduceat(np.asarray(arrays['low']), starts),
+        'close': np.asarray(arrays['close'])[ends],
+        'volume': np.add.reduceat(np.asarray(arrays['volume']), starts),
+    }
+
+
+def resample_ohlcv(df, target_timeframe):
+    """resample_arrays'in DataFrame sürümü (collector çıktısıyla aynı kolonlar)."""
+    out = resample_arrays({col: df[col].to_numpy() for col in COLUMNS}, target_timeframe)
+    result = pd.DataFrame(out, columns=COLUMNS)
+    result['timestamp'] = result['timestamp'].astype(np.int64)
+    return result
+
+
+class IncrementalResampler:
+    """
+    Tek bir üst zaman dilimi için, taban mumlar geldikçe güncellenen toplayıcı.
+
+    Kovadaki kapanmış taban mumlar `_closed` içinde birikir; borsanın hâlâ
+    güncellediği son taban mum `_live` olarak ayrı tutulur. Böylece aynı
+    timestamp ile tekrar gelen canlı mum, kısmi üst mumu bozmadan yerine geçer.
+    """
+    def __init__(self, target_timeframe):
+        self.target_timeframe = target_timeframe
+        self.step = timeframe_to_ms(target_timeframe)
+        self._bucket = None
+        self._closed = None   # [open, high, low, close, volume]
+        self._live = None     # [timestamp, open, high, low, close, volume]
+
+    @property
+    def last_base_timestamp(self):
+        return None if self._live is None else self._live[0]
+
+    @staticmethod
+    def _merge(agg, bar):
+        if agg is None:
+            return list(bar)
+        return [agg[0], max(agg[1], bar[1]), min(agg[2], bar[2]), bar[3], agg[4] + bar[4]]
+
+    def _current_bar(self):
+        agg = self._merge(self._closed, self._live[1:])
+        return [self._bucket] + agg
+
+    def update(self, df):
+        """
+        Yeni taban mumları işler. Kapanan üst zaman dilimi mumlarını
+        [timestamp, open, high, low, close, volume] listeleri olarak döner.
+        Canlı mumdan eski satırlar (zaten işlenmiş) yok sayılır.
+        """
+        completed = []
+        for row in df[COLUMNS].itertuples(index=False, name=None):
+            ts = row[0]
+            if self._live is not None:
+                if ts < self._live[0]:
+                    continue
+                if ts == self._live[0]:
+                    self._live = list(row)
+                    continue
+
+                bucket = (ts // self.step) * self.step
+                if bucket != self._bucket:
+                    completed.append(self._current_bar())
+                    self._closed = None
+                else:
+                    self._closed = self._merge(self._closed, self._live[1:])
+                self._bucket = bucket
+                self._live = list(row)
+            else:
+                self._bucket = (ts // self.step) * self.step
+                self._live = list(row)
+        return completed
+
+    def partial(self):
+        """Henüz kapanmamış üst mumu döner (veri yoksa None)."""
+        if self._live is None:
+            return None
+        return self._current_bar()
@@ -1,5 +1,3 @@
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-
 class SentimentAnalysis:
     """
     SDD Bölüm 5.3.3 uyarınca Duygu Analizi Sınıfı.
@@ -7,6 +5,7 @@ class SentimentAnalysis:
     """
     
     def __init__(self):
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
         self.analyzer = SentimentIntensityAnalyzer()
         
         # Kripto Jargonunu VADER'a öğretiyoruz (ÖZEL EKLENTİ)
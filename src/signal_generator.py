@@ -1,38 +1,49 @@
+import numpy as np
 import pandas as pd
+from trade_ledger import SELL
+
+# Tek adımlık (T+1) tahminde AL/SAT için gereken asgari beklenen getiri
+ML_STEP_THRESHOLD = 0.005
 
 class HybridSignalGenerator:
     """
     SDD Bölüm 5.3.6: Hibrit Sinyal Üretici Sınıfı.
     Teknik, Duygu ve ML verilerini birleştirir.
     Geçmiş işlem başarısına göre dinamik eşik ayarı (Feedback Loop) içerir.
+    signal_log verilirse her karar bileşen skorlarıyla birlikte kaydedilir.
     """
-    def __init__(self, tech_weight=0.4, sentiment_weight=0.2, ml_weight=0.4):
+    def __init__(self, tech_weight=0.4, sentiment_weight=0.2, ml_weight=0.4, signal_log=None):
         self.tech_weight = tech_weight
         self.sentiment_weight = sentiment_weight
         self.ml_weight = ml_weight
+        self.signal_log = signal_log
+        self.last_components = {}
 
-    def adjust_thresholds_based_on_history(self, trade_history):
+    def adjust_thresholds_based_on_history(self, trade_stats):
         """
         Geçmiş işlemlere bakarak risk iştahını ayarlar.
         Eşikleri yükselttik (Bot artık çok emin olmadan işlem yapmayacak).
+        trade_stats: TradeLedger.summary() çıktısı (O(1) özet).
         """
         base_threshold = 0.20  # Eskiden 0.15'ti. Artık daha zor sinyal üretecek.
         
-        if not trade_history:
+        if not trade_stats or trade_stats.get('last_side') != SELL:
             return base_threshold
             
-        last_trade = trade_history[-1]
+        last_pnl = trade_stats.get('last_pnl') or 0
         
-        if "🔻" in last_trade: 
+        if last_pnl <= 0: 
             return 0.30 # Zarar edildiyse çok daha zor işlem yap (Defansif Mod)
-        elif "💰" in last_trade: 
+        else: 
             return 0.15 # Kâr edildiyse biraz daha rahat işlem yapabilir
-            
-        return base_threshold
 
-    def generate_signal(self, current_price, predicted_price, sentiment_score, tech_indicators, trade_history=[]):
+    def generate_signal(self, current_price, predicted_price, sentiment_score, tech_indicators, trade_stats=None,
+                        symbol=None, timestamp=None):
         """
         Girdileri birleştirip AL/SAT/TUT sinyali üretir.
+        predicted_price: tek bir T+1 tahmini veya T+1 ... T+K tahmin yolu (dizi).
+        Bileşen skorları self.last_components'a yazılır; symbol ve timestamp
+        verilirse karar signal_log'a da eklenir.
         """
         
         # 1. Teknik Analiz Skoru
@@ -50,12 +61,15 @@ class HybridSignalGenerator:
         else:
             tech_score -= 0.5
             
-        # 2. ML Tahmin Skoru
+        # 2. ML Tahmin Skoru: ufkun sonundaki (T+K) beklenen getiri. Tek adımlık %0.5 eşiği
+        # sqrt(K) ile ölçeklenir (K adımlık getirinin oynaklığı ~sqrt(K) kat); K=1'de eskisiyle aynı.
         ml_score = 0
-        price_diff_ratio = (predicted_price - current_price) / current_price
+        predicted_path = np.atleast_1d(np.asarray(predicted_price, dtype=np.float64))
+        price_diff_ratio = float(predicted_path[-1] / current_price - 1)
+        ml_threshold = ML_STEP_THRESHOLD * np.sqrt(len(predicted_path))
         
-        if price_diff_ratio > 0.005: ml_score = 1
-        elif price_diff_ratio < -0.005: ml_score = -1
+        if price_diff_ratio > ml_threshold: ml_score = 1
+        elif price_diff_ratio < -ml_threshold: ml_score = -1
         
         # 3. Duygu Skoru
         sent_score = sentiment_score
@@ -66,7 +80,7 @@ class HybridSignalGenerator:
                       (ml_score * self.ml_weight)
                       
         # 5. Dinamik Karar Mekanizması
-        threshold = self.adjust_thresholds_based_on_history(trade_history)
+        threshold = self.adjust_thresholds_based_on_history(trade_stats)
         
         signal = "HOLD"
         confidence = abs(final_score)
@@ -75,5 +89,10 @@ class HybridSignalGenerator:
             signal = "BUY"
         elif final_score < -threshold:
             signal = "SELL"
+
+        self.last_components = {'tech': tech_score, 'sentiment': sent_score, 'ml': ml_score, 'threshold': threshold}
+        if self.signal_log is not None and symbol is not None:
+            self.signal_log.record(symbol, timestamp, signal, final_score, self.last_components,
+                                   current_price, predicted_path[-1], len(predicted_path))
             
         return signal, final_score
\ No newline at end of file
@@ -0,0 +1,99 @@
+import numpy as np
+from buffered_log import BufferedLog
+
+SIGNAL_CODES = {"BUY": 1, "HOLD": 0, "SELL": -1}
+SIGNAL_NAMES = {code: name for name, code in SIGNAL_CODES.items()}
+
+SIGNAL_DTYPE = np.dtype([
+    ('timestamp', np.int64),   # ms
+    ('symbol_id', np.int32),
+    ('signal', np.int8),       # BUY=1, HOLD=0, SELL=-1
+    ('score', np.float64),     # Ağırlıklı toplam skor (generate_signal dönüşü)
+    ('tech', np.float64),
+    ('sentiment', np.float64),
+    ('ml', np.float64),
+    ('threshold', np.float64),
+    ('price', np.float64),
+    ('predicted_price', np.float64),  # Kararda kullanılan T+horizon tahmini
+    ('horizon', np.float64),          # Tahmin ufku K (adım); bilinmiyorsa NaN
+])
+
+HISTORY_COLUMNS = ('timestamp', 'signal', 'score', 'tech', 'sentiment', 'ml', 'threshold', 'price', 'predicted_price',
+                   'horizon')
+
+
+class SignalLog(BufferedLog):
+    """
+    Üretilen her sinyali (bileşen skorlarıyla birlikte) bellekte bir tamponda
+    biriktirir ve signals tablosuna toplu (batch) yazar (BufferedLog).
+
+    Sinyal, analiz edilen son mumun zaman damgasıyla kaydedilir; mum kapanana
+    kadar her döngüde yeniden üretilen karar aynı (symbol, timestamp) satırını
+    günceller: tamponda yerinde, DB'de upsert ile. Böylece mum başına tek kayıt
+    (o mumdaki son karar) kalır.
+    """
+    DTYPE = SIGNAL_DTYPE
+    keep_flushed = False
+
+    def __init__(self, db_manager=None, flush_every=50, flush_interval=60):
+        super().__init__(flush_every, db_manager=db_manager, flush_every=flush_every, flush_interval=flush_interval)
+        self._pending_index = {}  # (symbol_id, timestamp) -> tampondaki satır
+
+    def record(self, symbol, timestamp, signal, score, components=None, price=np.nan, predicted_price=np.nan,
+               horizon=np.nan):
+        """
+        Bir sinyal kararını tampona ekler (aynı mum için varsa günceller); gerekirse DB'ye yazar.
+        predicted_price: kararda kullanılan T+horizon tahmini.
+        """
+        c = components or {}
+        key = (self._symbol_id(symbol), int(timestamp))
+        row = (key[1], key[0], SIGNAL_CODES.get(signal, 0), score,
+               c.get('tech', np.nan), c.get('sentiment', np.nan), c.get('ml', np.nan),
+               c.get('threshold', np.nan), price, predicted_price, horizon)
+        i = self._pending_index.get(key)
+        if i is not None:
+            self._rows[i] = row
+            return
+        self._pending_index[key] = self._n
+        self._append(row)
+
+    def _db_rows(self, pending):
+        return list(zip(
+            [self.symbols[i] for i in pending['symbol_id']],
+            pending['timestamp'].tolist(),
+            [SIGNAL_NAMES[int(s)] for s in pending['signal']],
+            *(np.where(np.isnan(pending[col]), None, pending[col]).tolist()
+              for col in ('score', 'tech', 'sentiment', 'ml', 'threshold', 'price', 'predicted_price', 'horizon'))
+        ))
+
+    def _write(self, rows):
+        return self.db_manager.insert_signals(rows)
+
+    def flush(self):
+        written = super().flush()
+        if written:
+            self._pending_index.clear()
+        return written
+
+    def history(self, symbol, start=None, end=None):
+        """
+        DB'deki geçmiş + henüz yazılmamış tampon satırları; load_signals ile aynı
+        hizalı dizi sözlüğü. Panel her tick'te çağırabilir, flush tetiklemez.
+        """
+        stored = self.db_manager.load_signals(symbol, start, end) if self.db_manager is not None else None
+        pending = self.pending()
+        mask = pending['symbol_id'] == self._symbol_ids.get(symbol, -1)
+        if start is not None:
+            mask &= pending['timestamp'] >= start
+        if end is not None:
+            mask &= pending['timestamp'] < end
+        pending = pending[mask]
+
+        fresh = {col: pending[col] for col in HISTORY_COLUMNS}
+        if stored is None:
+            return fresh
+        # Yazıldıktan sonra tamponda tekrar güncellenen mumlarda tampondaki (son) karar geçerlidir
+        keep = ~np.isin(stored['timestamp'], fresh['timestamp'])
+        merged = {k: np.concatenate([stored[k][keep], fresh[k].astype(stored[k].dtype)]) for k in stored}
+        order = np.argsort(merged['timestamp'], kind='stable')
+        return {k: v[order] for k, v in merged.items()}
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from buffered_log import BufferedLog
+
+BUY = 1
+SELL = -1
+
+LEDGER_DTYPE = np.dtype([
+    ('timestamp', np.int64),   # ms
+    ('symbol_id', np.int32),
+    ('side', np.int8),         # BUY=1, SELL=-1
+    ('price', np.float64),
+    ('qty', np.float64),
+    ('fee', np.float64),
+    ('pnl', np.float64),       # Sadece SELL satırlarında anlamlı (gerçekleşen kâr/zarar)
+])
+
+
+class TradeLedger(BufferedLog):
+    """
+    İşlem geçmişini sayısal, dizi tabanlı (numpy structured array) tutar.
+
+    - Kapasite doldukça ikiye katlanır; ekleme amortize O(1).
+    - Kazanma oranı, toplam P/L ve maksimum düşüş (drawdown) her eklemede
+      artımlı güncellenir; summary() O(1) döner.
+    - Yeni satırlar bellekte biriktirilir ve DB'ye toplu (batch) yazılır
+      (BufferedLog); yazılan satırlar geçmiş ekranı için bellekte kalır.
+    """
+    DTYPE = LEDGER_DTYPE
+
+    def __init__(self, capacity=256, db_manager=None, mode='PAPER', flush_every=20, flush_interval=60):
+        super().__init__(capacity, db_manager=db_manager, flush_every=flush_every, flush_interval=flush_interval)
+        self.mode = mode
+
+        # Artımlı istatistikler
+        self.closed_trades = 0
+        self.wins = 0
+        self.total_pnl = 0.0
+        self.total_fees = 0.0
+        self.peak_pnl = 0.0
+        self.max_drawdown = 0.0
+        self.last_side = None
+        self.last_pnl = None
+
+    def record(self, timestamp, symbol, side, price, qty, fee=0.0, pnl=0.0):
+        """Bir işlemi deftere ekler, istatistikleri günceller, gerekirse DB'ye yazar."""
+        self.total_fees += fee
+        self.last_side = side
+        if side == SELL:
+            self.closed_trades += 1
+            self.wins += pnl > 0
+            self.total_pnl += pnl
+            self.last_pnl = pnl
+            self.peak_pnl = max(self.peak_pnl, self.total_pnl)
+            self.max_drawdown = max(self.max_drawdown, self.peak_pnl - self.total_pnl)
+
+        self._append((int(timestamp), self._symbol_id(symbol), side, price, qty, fee, pnl))
+
+    # --- ÖZET VE OKUMA ---
+
+    def summary(self):
+        """Eşik mantığı ve arayüz için O(1) özet."""
+        return {
+            'trades': self._n,
+            'closed_trades': self.closed_trades,
+            'win_rate': self.wins / self.closed_trades if self.closed_trades else None,
+            'total_pnl': self.total_pnl,
+            'total_fees': self.total_fees,
+            'max_drawdown': self.max_drawdown,
+            'last_side': self.last_side,
+            'last_pnl': self.last_pnl,
+        }
+
+    def rows(self):
+        """Kayıtlı satırların (kopyasız) görünümü."""
+        return self._rows[:self._n]
+
+    def page(self, page=0, page_size=20):
+        """En yeniden eskiye sıralı `page`. sayfayı DataFrame olarak döner."""
+        end = self._n - page * page_size
+        start = max(0, end - page_size)
+        if end <= 0:
+            return pd.DataFrame(columns=['Zaman', 'Parite', 'Yön', 'Fiyat', 'Miktar', 'Komisyon', 'P/L'])
+        chunk = self._rows[start:end][::-1]
+        return pd.DataFrame({
+            'Zaman': pd.to_datetime(chunk['timestamp'], unit='ms'),
+            'Parite': [self.symbols[i] for i in chunk['symbol_id']],
+            'Yön': np.where(chunk['side'] == BUY, 'ALIM', 'SATIŞ'),
+            'Fiyat': chunk['price'],
+            'Miktar': chunk['qty'],
+            'Komisyon': chunk['fee'],
+            'P/L': np.where(chunk['side'] == SELL, chunk['pnl'], np.nan),
+        })
+
+    def num_pages(self, page_size=20):
+        return max(1, -(-self._n // page_size))
+
+    # --- KALICILIK ---
+
+    def _db_rows(self, pending):
+        return [(self.symbols[r['symbol_id']], int(r['timestamp']), 'BUY' if r['side'] == BUY else 'SELL',
+                 float(r['price']), float(r['qty']), float(r['fee']), float(r['pnl']), self.mode)
+                for r in pending]
+
+    def _write(self, rows):
+        return self.db_manager.insert_trades(rows)
@@ -1,27 +1,59 @@
-import ccxt
-from datetime import datetime
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from metrics import MetricsRegistry
+from database_manager import DatabaseManager
+from trade_ledger import TradeLedger, BUY, SELL
+from portfolio import Portfolio
+
+FINAL_ORDER_STATES = ('closed', 'canceled', 'expired', 'rejected')
+ORDER_REFRESH_DELAY = 0.5  # Sonuçlanmamış emir tekrar sorgulanmadan önce beklenen süre (sn)
+ORDER_REFRESH_MAX_DELAY = 30.0  # Sorgu hataları üst üste gelince beklemenin üst sınırı (sn)
 
 class Trader:
     """
     Hem Sanal (Paper) hem de Gerçek (Real) ticareti yöneten hibrit sınıf.
+    Pozisyonlar sembol bazında Portfolio'da tutulur; aynı anda birden fazla
+    paritede pozisyon açılabilir (execute_signals).
+
+    REAL modda:
+    - Bakiye `balance_ttl` saniye önbellekte tutulur, emir olaylarında geçersiz kılınır.
+    - Emirler arka plandaki bir thread'e gönderilir (döngü beklemez). Emir
+      sonuçlanana kadar durumu, future tamamlanır tamamlanmaz (callback) işçi
+      thread'de yeniden sorgulanır; sonuç portföye poll_orders() ile işlenir.
+      Sorgu (fetch_order) hata verirse emir bekleyen kalır ve artan aralıklarla
+      yeniden sorgulanır; kayıt sadece emir hiç gönderilemediyse silinir.
+      Sinyal -> onay ve sinyal -> dolum gecikmeleri metrik olarak ölçülür.
+    - Dolmamış ALIM emri olan sembol pozisyonda sayılır.
     """
-    def __init__(self, mode='PAPER', exchange_id='binance', api_key=None, api_secret=None, paper_balance=10000):
+    def __init__(self, mode='PAPER', exchange_id='binance', api_key=None, api_secret=None, paper_balance=10000,
+                 balance_ttl=30, max_positions=5, max_weight=None, allocation='confidence'):
         self.mode = mode
-        self.in_position = False
-        self.trade_history = []
-        
-        # --- PAPER MODE AYARLARI ---
-        self.paper_usdt = paper_balance
-        self.paper_crypto = 0
-        self.paper_entry_price = 0
+        # Sayısal işlem defteri (eski emoji'li string listesi yerine); DB'ye toplu yazılır
+        self.ledger = TradeLedger(db_manager=DatabaseManager(), mode=mode)
+        self.metrics = MetricsRegistry()
+
+        # --- PORTFÖY (PAPER modda nakit de burada tutulur) ---
+        self.portfolio = Portfolio(cash=paper_balance if mode == 'PAPER' else 0.0,
+                                   max_positions=max_positions, max_weight=max_weight, rule=allocation)
 
         # --- REAL MODE AYARLARI ---
         self.exchange = None
+        self.balance_ttl = balance_ttl
+        self._balance = None
+        self._balance_time = 0.0
+        self._order_executor = None
+        self.pending_orders = {}  # symbol -> bekleyen emir bilgisi
+        self.last_latency = {}    # {'ack_ms': ..., 'fill_ms': ...}
+        self.ack_latency = self.metrics.histogram("order_ack_latency_seconds", "Sinyalden emir onayına süre")
+        self.fill_latency = self.metrics.histogram("order_fill_latency_seconds", "Sinyalden emir dolumuna süre")
+
         if self.mode == 'REAL':
             if not api_key or not api_secret:
                 raise ValueError("Gerçek işlem için API Key ve Secret gereklidir!")
-            
+
             # CCXT ile Borsa Bağlantısı
+            import ccxt # Sadece REAL modda gerekli
             exchange_class = getattr(ccxt, exchange_id)
             self.exchange = exchange_class({
                 'apiKey': api_key,
@@ -29,90 +61,312 @@ class Trader:
                 'enableRateLimit': True,
                 'options': {'defaultType': 'spot'} # Spot piyasa
             })
+            # Tek işçi: emirler gönderildiği sırayla borsaya iletilir
+            self._order_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="orders")
             print("🔌 Borsa bağlantısı kuruldu (REAL MODE).")
 
-    def get_balances(self, symbol):
+    def get_balances(self, symbol, force=False):
         """
         Mevcut USDT ve Coin bakiyesini getirir.
+        REAL modda sonuç önbellekten döner; force=True veya süre dolduysa borsaya gidilir.
         """
         base_currency = symbol.split('/')[0] # BTC
         quote_currency = symbol.split('/')[1] # USDT
 
         if self.mode == 'PAPER':
-            return self.paper_usdt, self.paper_crypto
-        
+            return self.portfolio.cash, self.portfolio.position(symbol)[0]
+
         elif self.mode == 'REAL':
+            balance = self._exchange_balance(force)
+            if balance is None:
+                return 0, 0
+            usdt_free = balance.get(quote_currency, {}).get('free', 0)
+            coin_free = balance.get(base_currency, {}).get('free', 0)
+            return usdt_free, coin_free
+
+    def _exchange_balance(self, force=False):
+        """fetch_balance sonucunu balance_ttl saniye önbellekte tutar; hata olursa None."""
+        now = time.monotonic()
+        if force or self._balance is None or now - self._balance_time > self.balance_ttl:
             try:
-                balance = self.exchange.fetch_balance()
-                usdt_free = balance.get(quote_currency, {}).get('free', 0)
-                coin_free = balance.get(base_currency, {}).get('free', 0)
-                return usdt_free, coin_free
+                self.metrics.cache_misses.inc(cache="balance")
+                self.metrics.exchange_calls.inc(endpoint="fetch_balance")
+                self._balance = self.exchange.fetch_balance()
+                self._balance_time = now
             except Exception as e:
                 print(f"Bakiye hatası: {e}")
-                return 0, 0
+                return None
+        else:
+            self.metrics.cache_hits.inc(cache="balance")
+        return self._balance
+
+    def in_position(self, symbol):
+        """Açık pozisyon veya henüz dolmamış ALIM emri varsa True."""
+        p = self.pending_orders.get(symbol)
+        return (p is not None and p['side'] == BUY) or self.portfolio.in_position(symbol)
+
+    def pending_buys(self):
+        """Borsada henüz sonuçlanmamış ALIM emirleri için ayrılan tutar: {sembol: USDT}."""
+        return {s: p['qty'] * p['price'] for s, p in list(self.pending_orders.items())
+                if p['side'] == BUY and not p.get('settled')}
+
+    @property
+    def num_positions(self):
+        """Açık pozisyonlar + dolmamış ALIM emirleri."""
+        pending_buys = sum(1 for s, p in list(self.pending_orders.items())
+                           if p['side'] == BUY and not self.portfolio.in_position(s))
+        return self.portfolio.num_open + pending_buys
+
+    def equity(self, prices, quote='USDT'):
+        """
+        Toplam portföy değeri ve sembol başına gerçekleşmemiş P/L (vektörel).
+        prices: {sembol: anlık fiyat}.
+        """
+        cash = None
+        if self.mode == 'REAL':
+            balance = self._exchange_balance() or {}
+            cash = balance.get(quote, {}).get('free', 0)
+        return self.portfolio.mark_to_market(prices, cash=cash)
+
+    def invalidate_balances(self):
+        """Emir gönderildiğinde/dolduğunda bakiye önbelleğini geçersiz kılar."""
+        self._balance = None
+
+    @staticmethod
+    def _fill_details(order, requested_qty, fallback_price):
+        """ccxt emir cevabından (miktar, ortalama fiyat, komisyon) çıkarır; eksikse tahmin kullanır."""
+        order = order or {}
+        qty = order.get('filled') or requested_qty
+        price = order.get('average') or order.get('price') or fallback_price
+        fee = (order.get('fee') or {}).get('cost') or 0.0
+        return qty, price, fee
+
+    # --- ASENKRON EMİR YÖNETİMİ (REAL) ---
+
+    def _place_order(self, symbol, side, qty):
+        """İşçi thread'de çalışır: emri gönderir, (emir, onay zamanı) döner."""
+        self.metrics.exchange_calls.inc(endpoint="create_order")
+        if side == BUY:
+            order = self.exchange.create_market_buy_order(symbol, qty)
+        else:
+            order = self.exchange.create_market_sell_order(symbol, qty)
+        return order, time.perf_counter()
 
-    def execute_trade(self, signal, symbol, current_price, timestamp):
+    def _refresh_order(self, order, symbol, delay=ORDER_REFRESH_DELAY):
+        """İşçi thread'de çalışır: `delay` saniye bekledikten sonra emrin güncel durumunu sorgular."""
+        time.sleep(delay)
+        self.metrics.exchange_calls.inc(endpoint="fetch_order")
+        return self.exchange.fetch_order(order['id'], symbol), time.perf_counter()
+
+    def _submit_order(self, symbol, side, qty, price, timestamp, signal_time):
+        self.invalidate_balances()
+        p = {'side': side, 'qty': qty, 'price': price, 'timestamp': timestamp,
+             'signal_time': signal_time, 'ack_time': None, 'acked': False,
+             'order': None, 'refresh_errors': 0}
+        p['future'] = self._order_executor.submit(self._place_order, symbol, side, qty)
+        self.pending_orders[symbol] = p
+        p['future'].add_done_callback(partial(self._on_order_done, symbol, p))
+
+    def _on_order_done(self, symbol, p, future):
+        """
+        Future tamamlanınca (işçi thread'de) çalışır. Onay zamanını saklar ve emir
+        henüz sonuçlanmadıysa durumu hemen yeniden sorgular; böylece dolum zamanı
+        döngü aralığına (60 sn) değil borsanın cevabına göre ölçülür.
+        Borsa emri kabul ettikten sonra gelen sorgu hataları emri düşürmez;
+        sorgu artan aralıklarla (en fazla ORDER_REFRESH_MAX_DELAY) tekrarlanır.
         """
-        Sinyale göre (AL/SAT) işlem yapar.
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            if p['order'] is None:
+                return  # Emir gönderilemedi; kayıt poll_orders() ile silinir
+            p['refresh_errors'] += 1
+            print(f"⚠️ Emir durumu alınamadı ({symbol}), tekrar denenecek: {error}")
+            order = p['order']
+        else:
+            order, event_time = future.result()
+            p['order'] = order
+            p['refresh_errors'] = 0
+            if p['ack_time'] is None:
+                p['ack_time'] = event_time
+            if order.get('status') in FINAL_ORDER_STATES:
+                # Borsa bakiyesi artık emri yansıtıyor; tutar ayrıca rezerve edilmez
+                p['settled'] = True
+                self.invalidate_balances()
+                return
+        delay = min(ORDER_REFRESH_DELAY * 2 ** p['refresh_errors'], ORDER_REFRESH_MAX_DELAY)
+        try:
+            refresh = self._order_executor.submit(self._refresh_order, order, symbol, delay)
+        except RuntimeError:
+            return  # shutdown() çağrıldı; durum bir sonraki oturumda borsadan okunur
+        p['future'] = refresh
+        refresh.add_done_callback(partial(self._on_order_done, symbol, p))
+
+    def poll_orders(self):
+        """
+        Bekleyen emirlerin durumunu işler (bloklamaz). Dolan emirler portföye ve
+        deftere yazılır; reddedilen/iptal edilen emirler pozisyonu değiştirmez.
+        Dönüş: bu çağrıda sonuçlanan emirler için log mesajları.
         """
-        date_str = datetime.fromtimestamp(timestamp/1000).strftime('%Y-%m-%d %H:%M')
+        logs = []
+        for symbol, p in list(self.pending_orders.items()):
+            future = p['future']
+            if not future.done():
+                continue
+            error = future.exception()
+            if error is not None:
+                if p['order'] is None:
+                    # Emir borsaya hiç ulaşmadı
+                    del self.pending_orders[symbol]
+                    self.invalidate_balances()
+                    logs.append(f"Borsa Hatası: {error}")
+                continue  # Durum sorgusu hata verdi; _on_order_done yeniden deniyor
+            order, event_time = future.result()
+
+            if not p['acked']:
+                p['acked'] = True
+                ack = (p['ack_time'] or event_time) - p['signal_time']
+                self.ack_latency.observe(ack, side='BUY' if p['side'] == BUY else 'SELL')
+                self.last_latency['ack_ms'] = ack * 1000
+
+            if order.get('status') not in FINAL_ORDER_STATES:
+                continue  # _on_order_done yeniden sorgulamayı zaten başlattı
+
+            del self.pending_orders[symbol]
+            self.invalidate_balances()
+            qty, fill_price, fee = self._fill_details(order, p['qty'], p['price'])
+            if order.get('status') != 'closed' and not order.get('filled'):
+                logs.append(f"⚠️ Emir sonuçlanmadı: {order.get('status')}")
+                continue
+
+            fill = event_time - p['signal_time']
+            self.fill_latency.observe(fill, side='BUY' if p['side'] == BUY else 'SELL')
+            self.last_latency['fill_ms'] = fill * 1000
+
+            # Nakit borsada tutulur (pay=False); portföy sadece pozisyonu izler
+            if p['side'] == BUY:
+                self.portfolio.open(symbol, qty, fill_price, p['timestamp'], fee, pay=False)
+                self.ledger.record(p['timestamp'], symbol, BUY, fill_price, qty, fee)
+                logs.append(f"🟢 [GERÇEK] ALIM DOLDU ({symbol}): {qty:.4f} adet @ {fill_price}$")
+            else:
+                _, profit = self.portfolio.close(symbol, fill_price, qty, fee, pay=False)
+                self.ledger.record(p['timestamp'], symbol, SELL, fill_price, qty, fee, profit)
+                logs.append(f"🔴 [GERÇEK] SATIŞ DOLDU ({symbol}): P/L: {profit:.2f}$")
+        return logs
+
+    def shutdown(self):
+        """
+        Bekleyen emir thread'ini kapatır, son döngüden beri sonuçlanan emirleri
+        portföye/deftere işler ve defteri DB'ye yazar. Dönüş: poll_orders() log mesajları.
+        """
+        logs = []
+        if self._order_executor is not None:
+            self._order_executor.shutdown(wait=True)
+            logs = self.poll_orders()
+            for log in logs:
+                print(log)
+        self.ledger.flush()
+        return logs
+
+    def execute_trade(self, signal, symbol, current_price, timestamp, signal_time=None, amount_usdt=None):
+        """
+        Tek bir parite için sinyale göre (AL/SAT) işlem yapar.
+        signal_time: sinyalin üretildiği an (time.perf_counter); gecikme ölçümü için.
+        amount_usdt: ALIM'da harcanacak tutar; verilmezse portföy dağıtım kuralı belirler.
+        REAL modda sonuçlanan emirler önceden poll_orders() ile işlenmiş olmalıdır.
+        """
+        signal_time = signal_time or time.perf_counter()
+
+        if symbol in self.pending_orders:
+            return False, "⏳ Bekleyen emir sonuçlanmadı."
+
         usdt_bal, coin_bal = self.get_balances(symbol)
-        
+        in_position = self.portfolio.in_position(symbol)
+
         # --- ALIM (BUY) ---
-        if signal == "BUY" and not self.in_position:
-            # Bakiyenin %99'u ile al (Komisyon payı bırak)
-            amount_usdt = usdt_bal * 0.99 
-            
-            if amount_usdt < 10: # Binance min işlem limiti genellikle 10$
+        if signal == "BUY" and not in_position:
+            if self.num_positions >= self.portfolio.max_positions:
+                return False, "🔒 Maksimum pozisyon sayısına ulaşıldı."
+
+            pending = self.pending_buys()
+            if amount_usdt is None:
+                allocation = self.portfolio.allocate({symbol: 1.0}, {symbol: current_price}, cash=usdt_bal,
+                                                     pending=pending)
+                amount_usdt = allocation.get(symbol, 0.0)
+            # Dolmamış ALIM emirlerinin tutarı borsada henüz düşülmemiş olabilir
+            amount_usdt = min(amount_usdt, usdt_bal - sum(pending.values()))
+
+            if amount_usdt < self.portfolio.min_order: # Binance min işlem limiti genellikle 10$
                 return False, "❌ Yetersiz Bakiye (Min 10$)"
 
+            amount_coin = amount_usdt / current_price
             if self.mode == 'PAPER':
-                amount_coin = amount_usdt / current_price
-                self.paper_crypto = amount_coin
-                self.paper_usdt = 0
-                self.paper_entry_price = current_price
-                log = f"🔵 [SANAL] ALIM: {current_price}$ fiyatından alındı."
-            
+                self.portfolio.open(symbol, amount_coin, current_price, timestamp)
+                self.ledger.record(timestamp, symbol, BUY, current_price, amount_coin)
+                log = f"🔵 [SANAL] ALIM ({symbol}): {current_price}$ fiyatından {amount_usdt:.2f}$ alındı."
+
             elif self.mode == 'REAL':
-                try:
-                    # Piyasa emri ile al (Market Buy)
-                    # amount_coin hesaplaması yerine create_market_buy_order cost parametresi (bazı borsalar desteklemez)
-                    # O yüzden coin miktarını hesaplayıp gönderiyoruz
-                    amount_coin = amount_usdt / current_price
-                    order = self.exchange.create_market_buy_order(symbol, amount_coin)
-                    log = f"🟢 [GERÇEK] ALIM EMRİ GİRİLDİ: {amount_coin:.4f} adet."
-                except Exception as e:
-                    return False, f"Borsa Hatası: {e}"
-
-            self.in_position = True
-            self.trade_history.append(log)
+                # Piyasa emri ile al (Market Buy)
+                # amount_coin hesaplaması yerine create_market_buy_order cost parametresi (bazı borsalar desteklemez)
+                # O yüzden coin miktarını hesaplayıp gönderiyoruz
+                self._submit_order(symbol, BUY, amount_coin, current_price, timestamp, signal_time)
+                log = f"🟢 [GERÇEK] ALIM EMRİ GÖNDERİLDİ ({symbol}): {amount_coin:.4f} adet."
+
             return True, log
 
         # --- SATIŞ (SELL) ---
-        elif signal == "SELL" and self.in_position:
-            if coin_bal <= 0 and self.mode == 'REAL':
-                self.in_position = False
-                return False, "Satılacak coin yok."
-
+        elif signal == "SELL" and in_position:
             if self.mode == 'PAPER':
-                new_balance = self.paper_crypto * current_price
-                profit = new_balance - (self.paper_crypto * self.paper_entry_price)
-                self.paper_usdt = new_balance
-                self.paper_crypto = 0
-                
+                qty, profit = self.portfolio.close(symbol, current_price)
+                self.ledger.record(timestamp, symbol, SELL, current_price, qty, 0.0, profit)
+
                 emoji = "💰" if profit > 0 else "🔻"
-                log = f"{emoji} [SANAL] SATIŞ: P/L: {profit:.2f}$"
+                log = f"{emoji} [SANAL] SATIŞ ({symbol}): P/L: {profit:.2f}$"
 
             elif self.mode == 'REAL':
-                try:
-                    # Tüm coini sat
-                    order = self.exchange.create_market_sell_order(symbol, coin_bal)
-                    log = f"🔴 [GERÇEK] SATIŞ EMRİ GİRİLDİ."
-                except Exception as e:
-                    return False, f"Borsa Hatası: {e}"
-
-            self.in_position = False
-            self.trade_history.append(log)
+                if coin_bal <= 0:
+                    self.portfolio.close(symbol, current_price, pay=False)  # Pozisyon borsada yok
+                    return False, "Satılacak coin yok."
+                # Tüm coini sat
+                self._submit_order(symbol, SELL, coin_bal, current_price, timestamp, signal_time)
+                log = f"🔴 [GERÇEK] SATIŞ EMRİ GÖNDERİLDİ ({symbol})."
+
             return True, log
 
-        return False, "İşlem yapılmadı."
\ No newline at end of file
+        return False, "İşlem yapılmadı."
+
+    def execute_signals(self, signals, prices, timestamps, signal_time=None):
+        """
+        Birden fazla paritenin sinyallerini tek seferde işler.
+        signals: {sembol: (sinyal, güven skoru)}, prices/timestamps: {sembol: değer}.
+
+        Önce SATIŞ'lar yapılır (nakit serbest kalır), ardından aynı anda gelen
+        ALIM sinyalleri arasında sermaye Portfolio.allocate kurallarıyla bölünür.
+        Dönüş: {sembol: (işlem yapıldı mı, log)}.
+        """
+        results = {}
+        for symbol, (signal, _) in signals.items():
+            if signal != "BUY":
+                results[symbol] = self.execute_trade(signal, symbol, prices[symbol], timestamps[symbol], signal_time)
+
+        buys = {s: conf for s, (signal, conf) in signals.items() if signal == "BUY"}
+        if buys:
+            if self.mode == 'REAL':
+                balance = self._exchange_balance() or {}
+                quote = next(iter(buys)).split('/')[1]
+                cash = balance.get(quote, {}).get('free', 0)
+            else:
+                cash = self.portfolio.cash
+            allocation = self.portfolio.allocate(buys, prices, cash=cash, pending=self.pending_buys())
+            for symbol in buys:
+                if symbol in allocation:
+                    results[symbol] = self.execute_trade("BUY", symbol, prices[symbol], timestamps[symbol],
+                                                         signal_time, allocation[symbol])
+                elif symbol in self.pending_orders:
+                    results[symbol] = (False, "⏳ Bekleyen emir sonuçlanmadı.")
+                elif self.portfolio.in_position(symbol):
+                    results[symbol] = (False, "İşlem yapılmadı.")
+                else:
+                    results[symbol] = (False, "❌ Sermaye dağıtımında pay ayrılmadı.")
+        return results
@@ -0,0 +1,149 @@
+import numpy as np
+
+
+def scale_series(columns, scaler, feature_cols, out_path=None, chunk_size=1_000_000):
+    """
+    Ham kolonları (DataFrame veya candle_store.read_arrays çıktısı) parça parça
+    ölçekleyip (N, F) float32 diziye yazar. out_path verilirse sonuç diskte
+    np.memmap olarak tutulur; RAM kullanımı chunk_size ile sınırlı kalır.
+    """
+    # np.asarray: memmap ve float64 DataFrame kolonları için kopya oluşturmaz
+    columns = {c: np.asarray(columns[c]) for c in feature_cols}
+    n = len(columns[feature_cols[0]])
+    shape = (n, len(feature_cols))
+    if out_path:
+        out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=shape)
+    else:
+        out = np.empty(shape, dtype=np.float32)
+
+    for start in range(0, n, chunk_size):
+        end = min(start + chunk_size, n)
+        chunk = np.column_stack([columns[c][start:end].astype(np.float64) for c in feature_cols])
+        out[start:end] = scaler.transform(chunk)
+    if out_path:
+        out.flush()
+    return out
+
+
+def fit_scaler_stream(chunks, feature_cols):
+    """
+    MinMaxScaler'ı bir DataFrame parça akışı (örn. DatabaseManager.iter_ohlcv)
+    üzerinde partial_fit ile fit eder. Dönüş: (scaler, toplam satır sayısı).
+    """
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    n = 0
+    for chunk in chunks:
+        if len(chunk):
+            scaler.partial_fit(chunk[feature_cols].to_numpy(dtype=np.float64))
+            n += len(chunk)
+    return scaler, n
+
+
+def scale_stream(chunks, scaler, feature_cols, n, out_path):
+    """Parça akışını ölçekleyip diskteki (n, F) float32 memmap'e sırayla yazar."""
+    out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=(n, len(feature_cols)))
+    pos = 0
+    for chunk in chunks:
+        end = min(pos + len(chunk), n)
+        out[pos:end] = scaler.transform(chunk[feature_cols].to_numpy(dtype=np.float64)[:end - pos])
+        pos = end
+    out.flush()
+    return out
+
+
+def fit_scaler_chunked(columns, feature_cols, chunk_size=1_000_000):
+    """MinMaxScaler'ı tüm veriyi belleğe almadan partial_fit ile parça parça fit eder."""
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    columns = {c: np.asarray(columns[c]) for c in feature_cols}
+    n = len(columns[feature_cols[0]])
+    for start in range(0, n, chunk_size):
+        end = min(start + chunk_size, n)
+        scaler.partial_fit(np.column_stack([columns[c][start:end].astype(np.float64) for c in feature_cols]))
+    return scaler
+
+
+class WindowStream:
+    """
+    Ölçeklenmiş (N, F) float32 serilerden eğitim pencerelerini batch batch üretir.
+    (N-lookback, lookback, F) boyutlu X hiçbir zaman tamamen oluşturulmaz;
+    bellekte sadece seriler (memmap olabilir) ve o anki batch bulunur.
+
+    - Birden fazla seri (sembol) verilirse, her batch'in sembolü kalan pencere
+      sayısıyla orantılı seçilir; böylece semboller tek bir eğitimde karışır.
+    - Karıştırma, shuffle_buffer büyüklüğündeki bloklar içinde yapılır
+      (blok sırası da karıştırılır); indeks belleği de sınırlı kalır.
+    - ranges: her seri için hedef indeks aralığı [başlangıç, bitiş); train/holdout
+      ayrımı için kullanılır. Varsayılan tüm geçerli pencereler.
+    - horizon: hedef, indeksten başlayan `horizon` adımlık yoldur; y (B, horizon).
+      Aralık sonu en fazla len(seri) - horizon + 1 olmalıdır.
+    """
+    def __init__(self, series_list, lookback=60, batch_size=256, shuffle_buffer=8192,
+                 prefetch=2, ranges=None, target_col=0, seed=None, horizon=1):
+        self.series_list = series_list
+        self.lookback = lookback
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.prefetch = prefetch
+        self.target_col = target_col
+        self.horizon = horizon
+        self.n_features = series_list[0].shape[1]
+        self.ranges = ranges or [(lookback, len(s) - horizon + 1) for s in series_list]
+        self._rng = np.random.default_rng(seed)
+        self._offsets = np.arange(-lookback, 0)
+        self._steps = np.arange(horizon)
+
+    @property
+    def num_windows(self):
+        return sum(max(0, end - start) for start, end in self.ranges)
+
+    def _index_blocks(self, start, end, shuffle):
+        """[start, end) hedef indekslerini shuffle_buffer'lık bloklar halinde üretir."""
+        block_starts = np.arange(start, end, self.shuffle_buffer)
+        if shuffle:
+            self._rng.shuffle(block_starts)
+        for b in block_starts:
+            idx = np.arange(b, min(b + self.shuffle_buffer, end))
+            if shuffle:
+                self._rng.shuffle(idx)
+            yield from np.array_split(idx, max(1, int(np.ceil(len(idx) / self.batch_size))))
+
+    def gather(self, series_id, idx):
+        """Hedef indeksleri için (B, lookback, F) pencereleri ve (B, horizon) hedef yollarını döner."""
+        series = self.series_list[series_id]
+        X = np.asarray(series[idx[:, None] + self._offsets], dtype=np.float32)
+        y = np.asarray(series[idx[:, None] + self._steps, self.target_col], dtype=np.float32)
+        return X, y
+
+    def batches(self, shuffle=True):
+        """(X, y) float32 batch üreteci. Her çağrı yeni bir epoch'tur."""
+        iterators = [self._index_blocks(start, end, shuffle) for start, end in self.ranges]
+        remaining = np.array([max(0, end - start) for start, end in self.ranges], dtype=np.float64)
+        active = remaining > 0
+
+        while active.any():
+            if shuffle:
+                probs = np.where(active, remaining, 0)
+                series_id = int(self._rng.choice(len(iterators), p=probs / probs.sum()))
+            else:
+                series_id = int(np.flatnonzero(active)[0])
+            idx = next(iterators[series_id], None)
+            if idx is None or len(idx) == 0:
+                active[series_id] = False
+                continue
+            remaining[series_id] -= len(idx)
+            if remaining[series_id] <= 0:
+                active[series_id] = False
+            yield self.gather(series_id, idx)
+
+    def as_tf_dataset(self, shuffle=True):
+        """Keras model.fit'e verilebilecek, prefetch'li tf.data.Dataset döner."""
+        import tensorflow as tf
+
+        signature = (tf.TensorSpec(shape=(None, self.lookback, self.n_features), dtype=tf.float32),
+                     tf.TensorSpec(shape=(None, self.horizon), dtype=tf.float32))
+        dataset = tf.data.Dataset.from_generator(lambda: self.batches(shuffle), output_signature=signature)
+        return dataset.prefetch(self.prefetch)